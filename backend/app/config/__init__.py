@@ -10,6 +10,12 @@ from .settings import (
     UMAP_N_JOBS,
     UMAP_DATA_SIZE,
     UMAP_DATASET,
+    UMAP_EMBEDDING_MODE,
+    UMAP_WARM_START_EPOCHS,
+    UMAP_REDUCER_DIR,
+    UMAP_PCA_COMPONENTS,
+    UMAP_WARMUP,
+    UMAP_NUMBA_CACHE_DIR,
     MAX_GRAD_NORM,
     UNLEARN_SEED,
     MOMENTUM,
@@ -19,7 +25,36 @@ from .settings import (
     EPOCHS,
     DECREASING_LR,
     GAMMA,
-    GPU_ID
+    GPU_ID,
+    DATASET_STORE_DTYPE,
+    DATASET_BACKEND,
+    DATASET_CACHE_DIR,
+    DATALOADER_NUM_WORKERS,
+    DATALOADER_PREFETCH_FACTOR,
+    DATALOADER_PIN_MEMORY,
+    DATALOADER_PERSISTENT_WORKERS,
+    EVALUATION_BATCH_SIZE,
+    DATASET_VERSION,
+    LOGITS_CACHE_ENABLED,
+    LOGITS_CACHE_DIR,
+    LOGITS_CACHE_MAX_BYTES,
+    CKA_REFERENCE_DIR,
+    MIA_CLASSIFIER_BACKEND,
+    MIA_SHADOW_SIZE,
+    EPOCH_METRICS_CACHE_DIR,
+    EPOCH_METRICS_SUBSAMPLE_SIZE,
+    EPOCH_METRICS_BOOTSTRAP_SAMPLES,
+    EPOCH_METRICS_CI_LEVEL,
+    PLOT_WORKERS,
+    PLOT_UMAP,
+    PLOT_EPOCH_METRICS,
+    PLOT_TRAINING_CURVES,
+    PLOT_DISTRIBUTIONS,
+    POINTS_PROB_TOP_K,
+    RESULTS_DB_PATH,
+    DATA_IO_THREADS,
+    GZIP_MINIMUM_SIZE,
+    GZIP_COMPRESS_LEVEL
 )
 
 __all__ = [
@@ -31,6 +66,12 @@ __all__ = [
     'UMAP_N_JOBS',
     'UMAP_DATA_SIZE',
     'UMAP_DATASET',
+    'UMAP_EMBEDDING_MODE',
+    'UMAP_WARM_START_EPOCHS',
+    'UMAP_REDUCER_DIR',
+    'UMAP_PCA_COMPONENTS',
+    'UMAP_WARMUP',
+    'UMAP_NUMBA_CACHE_DIR',
     
     # Training settings
     'MAX_GRAD_NORM',
@@ -46,5 +87,60 @@ __all__ = [
     'GAMMA',
     
     # GPU Configuration
-    'GPU_ID'
+    'GPU_ID',
+
+    # Dataset store
+    'DATASET_STORE_DTYPE',
+    'DATASET_BACKEND',
+    'DATASET_CACHE_DIR',
+
+    # Data loading profile
+    'DATALOADER_NUM_WORKERS',
+    'DATALOADER_PREFETCH_FACTOR',
+    'DATALOADER_PIN_MEMORY',
+    'DATALOADER_PERSISTENT_WORKERS',
+
+    # Post-unlearning evaluation
+    'EVALUATION_BATCH_SIZE',
+
+    # Logits cache
+    'DATASET_VERSION',
+    'LOGITS_CACHE_ENABLED',
+    'LOGITS_CACHE_DIR',
+    'LOGITS_CACHE_MAX_BYTES',
+
+    # CKA reference cache
+    'CKA_REFERENCE_DIR',
+
+    # Membership inference attack
+    'MIA_CLASSIFIER_BACKEND',
+    'MIA_SHADOW_SIZE',
+
+    # Epoch metrics cache
+    'EPOCH_METRICS_CACHE_DIR',
+
+    # Epoch metrics subsample
+    'EPOCH_METRICS_SUBSAMPLE_SIZE',
+    'EPOCH_METRICS_BOOTSTRAP_SAMPLES',
+    'EPOCH_METRICS_CI_LEVEL',
+
+    # Plot rendering
+    'PLOT_WORKERS',
+    'PLOT_UMAP',
+    'PLOT_EPOCH_METRICS',
+    'PLOT_TRAINING_CURVES',
+    'PLOT_DISTRIBUTIONS',
+
+    # Columnar result arrays
+    'POINTS_PROB_TOP_K',
+
+    # Results store
+    'RESULTS_DB_PATH',
+
+    # Data router
+    'DATA_IO_THREADS',
+
+    # Response compression
+    'GZIP_MINIMUM_SIZE',
+    'GZIP_COMPRESS_LEVEL'
 ] 
\ No newline at end of file
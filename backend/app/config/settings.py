@@ -5,6 +5,12 @@ UMAP_RANDOM_STATE = 42
 UMAP_N_JOBS = -1
 UMAP_DATA_SIZE = 2000
 UMAP_DATASET = 'train'
+UMAP_EMBEDDING_MODE = 'transform'  # 'transform' or 'warm_start' into the base model's layout, or 'fit' per job
+UMAP_WARM_START_EPOCHS = 100
+UMAP_REDUCER_DIR = 'data/umap_reducers'
+UMAP_PCA_COMPONENTS = 50  # PCA dimension ahead of UMAP, fitted on the base model; 0 disables
+UMAP_WARMUP = True  # Compile the UMAP/pynndescent numba kernels in the background at startup
+UMAP_NUMBA_CACHE_DIR = 'data/numba_cache'
 
 MAX_GRAD_NORM = 100.0
 UNLEARN_SEED = 2048
@@ -18,4 +24,60 @@ DECREASING_LR = [80, 120]
 GAMMA = 0.2
 
 # GPU Configuration
-GPU_ID = 1
\ No newline at end of file
+GPU_ID = 1
+
+# Dataset store ('float32' or 'float16')
+DATASET_STORE_DTYPE = 'float32'
+DATASET_BACKEND = 'memory'  # 'memory' or 'mmap' (shared .npy files under DATASET_CACHE_DIR)
+DATASET_CACHE_DIR = 'data/tensor_cache'
+
+# Data loading profile of the training loaders (train, retain, forget); evaluation
+# and one-shot loaders read in-memory tensors in the calling thread
+DATALOADER_NUM_WORKERS = 0
+DATALOADER_PREFETCH_FACTOR = 2
+DATALOADER_PIN_MEMORY = True
+DATALOADER_PERSISTENT_WORKERS = True
+
+# Post-unlearning evaluation (one pass per split)
+EVALUATION_BATCH_SIZE = 1000
+
+# Logits cache (float32 outputs keyed by checkpoint hash and DATASET_VERSION)
+DATASET_VERSION = 'cifar10-v1'  # Bump when the evaluation data or preprocessing changes
+LOGITS_CACHE_ENABLED = True
+LOGITS_CACHE_DIR = 'data/logits_cache'
+LOGITS_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# CKA reference Grams (per forget class, original and retrain checkpoints)
+CKA_REFERENCE_DIR = 'data/cka_reference'
+
+# Membership inference attack classifier ('threshold' or 'svc' for parity checks)
+MIA_CLASSIFIER_BACKEND = 'threshold'
+MIA_SHADOW_SIZE = 4500  # Seeded shadow samples per split (non-forget classes)
+
+# Epoch-wise metrics preprocessing (retrain metrics and MIA shadow features)
+EPOCH_METRICS_CACHE_DIR = 'data/epoch_metrics_cache'
+
+# Epoch-wise metrics on a seeded, class-stratified subsample of each split
+EPOCH_METRICS_SUBSAMPLE_SIZE = 0  # Samples per split; 0 evaluates the full splits
+EPOCH_METRICS_BOOTSTRAP_SAMPLES = 200
+EPOCH_METRICS_CI_LEVEL = 0.95
+
+# Plot rendering (separate Agg processes; 0 workers renders inline) and per-artifact switches
+PLOT_WORKERS = 1
+PLOT_UMAP = True
+PLOT_EPOCH_METRICS = True
+PLOT_TRAINING_CURVES = True
+PLOT_DISTRIBUTIONS = False
+
+# Columnar result arrays (points and attack values); 0 keeps every probability above 0.001
+POINTS_PROB_TOP_K = 0
+
+# Indexed experiment results (SQLite mirror of the data/{forget_class} JSON files)
+RESULTS_DB_PATH = 'data/results.db'
+
+# Data router: threads for file reads, JSON parsing and image encoding
+DATA_IO_THREADS = 8
+
+# Response compression (gzip) for large JSON payloads
+GZIP_MINIMUM_SIZE = 1024  # Bytes; smaller responses are sent uncompressed
+GZIP_COMPRESS_LEVEL = 6
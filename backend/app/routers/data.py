@@ -1,52 +1,173 @@
 # Python standard libraries
 import base64
+import functools
 import io
 import json
 import os
-from collections import OrderedDict
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, Response
+import anyio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from PIL import Image
 import numpy as np
 
+from app.config import DATA_IO_THREADS, DATASET_VERSION
 from app.utils import load_cifar10_data
+from app.utils.columnar import convert_results
 from app.utils.data_loader import get_fixed_umap_indices
+from app.utils.http_cache import cache_headers, is_not_modified, not_modified
+from app.utils.results_store import BLOB_FIELDS, SORT_COLUMNS, get_results_store
 
 router = APIRouter()
+LIST_FIELDS = "cka,cka_retrain,attack,epoch_metrics"  # Experiment fields the dashboard keeps
 x_train, y_train = load_cifar10_data()
 
-@router.get("/data/{forget_class}/all")
-async def get_all_json_files(forget_class: str):
+# File reads, JSON parsing and image encoding run on this bounded pool so the
+# event loop (and /unlearn/status polling) is never blocked by them
+_io_limiter = None
+JSON_CHUNK_SIZE = 64 * 1024
+COLUMNAR_MARKERS = (b'"format": "columnar-v1"', b'"format":"columnar-v1"')
+
+async def _run_blocking(fn, *args, **kwargs):
+    global _io_limiter
+    if _io_limiter is None:
+        _io_limiter = anyio.CapacityLimiter(DATA_IO_THREADS)
+    return await anyio.to_thread.run_sync(
+        functools.partial(fn, *args, **kwargs), limiter=_io_limiter
+    )
+
+def _json_chunks(data):
+    """Compact JSON encoding of `data` in chunks of about JSON_CHUNK_SIZE."""
+    buffer = []
+    size = 0
+    for piece in json.JSONEncoder(separators=(',', ':')).iterencode(data):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= JSON_CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def _synced_results_store(forget_class: str):
+    """Results store reconciled with data/{forget_class}."""
+    store = get_results_store()
+    try:
+        found = forget_class.isdigit() and store.sync(forget_class)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error indexing results: {str(e)}")
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Directory for {forget_class} not found")
+    return store
+
+def _file_cache_headers(file_path: str, variant: str = ""):
+    """Validators of a file-backed response: path, size and mtime."""
+    stat = os.stat(file_path)
+    return cache_headers(f'{file_path}:{stat.st_size}:{stat.st_mtime_ns}:{variant}', stat.st_mtime)
+
+def _listing_cache_headers(forget_class: str, variant: str):
+    """
+    Validators of a listing of data/{forget_class}: every JSON file's name,
+    size and mtime, and the directory's mtime (which changes on deletions).
+    """
     data_dir = os.path.join('data', forget_class)
-    if not os.path.exists(data_dir):
+    if not forget_class.isdigit() or not os.path.isdir(data_dir):
         raise HTTPException(status_code=404, detail=f"Directory for {forget_class} not found")
     
-    json_files = [f for f in os.listdir(data_dir) if f.endswith('.json')]
-    if not json_files:
+    mtime = os.stat(data_dir).st_mtime
+    key = [data_dir, variant]
+    with os.scandir(data_dir) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                mtime = max(mtime, stat.st_mtime)
+                key.append(f'{entry.name}:{stat.st_size}:{stat.st_mtime_ns}')
+    return cache_headers('|'.join(key), mtime)
+
+def _include_fields(include: str):
+    return [name for name in include.split(',') if name in BLOB_FIELDS]
+
+def _check_encoding(encoding: str):
+    """
+    'rows' serves points and attack values as per-sample lists, 'columnar'
+    as the typed columns of app.utils.columnar.
+    """
+    if encoding not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail="encoding must be 'rows' or 'columnar'")
+
+@router.get("/data/{forget_class}/all")
+async def get_all_json_files(
+    request: Request,
+    forget_class: str,
+    include: str = LIST_FIELDS,
+    encoding: str = "rows"
+):
+    """
+    All experiments of a forget class, keyed by ID. Large fields are only
+    attached when listed in `include` (comma-separated); `points` is left
+    out by default.
+    """
+    _check_encoding(encoding)
+    headers = await _run_blocking(_listing_cache_headers, forget_class, f'all:{include}:{encoding}')
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    def list_experiments():
+        store = _synced_results_store(forget_class)
+        return store.list_json(
+            forget_class, include=_include_fields(include), encoding=encoding
+        )
+
+    all_data = await _run_blocking(list_experiments)
+    if all_data == '{}':
         raise HTTPException(status_code=404, detail=f"No JSON files found in {forget_class}")
     
-    def sort_key(filename):
-        if filename.startswith(f'000{forget_class}'):
-            return (0, filename)
-        elif filename.startswith(f'a00{forget_class}'):
-            return (1, filename)
-        else:
-            return (2, filename)
-    
-    json_files.sort(key=sort_key)
-    
-    all_data = OrderedDict()
-    for filename in json_files:
-        file_path = os.path.join(data_dir, filename)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                key = filename[:-5]
-                all_data[key] = json.load(f)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error reading file {filename}: {str(e)}")
+    return Response(content=all_data, media_type="application/json", headers=headers)
+
+@router.get("/data/{forget_class}/experiments")
+async def get_experiments(
+    request: Request,
+    forget_class: str,
+    method: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    include: str = "",
+    encoding: str = "rows"
+):
+    """
+    Filtered and sorted experiment summaries from the results index.
+    `sort` is one of ID, Method, CreatedAt, UA, RA, TUA, TRA, PS, RTE.
+    """
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise HTTPException(
+            status_code=400, detail=f"sort must be one of {', '.join(SORT_COLUMNS)}"
+        )
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    _check_encoding(encoding)
+    headers = await _run_blocking(
+        _listing_cache_headers,
+        forget_class,
+        f'experiments:{method}:{sort}:{order}:{include}:{encoding}'
+    )
+    if is_not_modified(request, headers):
+        return not_modified(headers)
     
-    return all_data
+    def list_experiments():
+        store = _synced_results_store(forget_class)
+        return store.list_json(
+            forget_class,
+            method=method,
+            sort=sort,
+            descending=order == "desc",
+            include=_include_fields(include),
+            encoding=encoding
+        )
+
+    experiments = await _run_blocking(list_experiments)
+    return Response(content=experiments, media_type="application/json", headers=headers)
 
 @router.get("/data/{forget_class}/all_weights_name")
 async def get_all_weights_name(forget_class: str):
@@ -54,6 +175,9 @@ async def get_all_weights_name(forget_class: str):
     Retrieve all existing weight file names for the provided forget_class.
     It looks in the 'unlearned_models/{forget_class}' directory for .pth files.
     """
+    return await _run_blocking(_list_weight_files, forget_class)
+
+def _list_weight_files(forget_class: str):
     model_dir = os.path.join('unlearned_models', forget_class)
     
     if not os.path.exists(model_dir):
@@ -85,7 +209,13 @@ async def get_model_file(forget_class: str, filename: str):
     return FileResponse(file_path, media_type='application/octet-stream', filename=filename)
 
 @router.get("/data/{forget_class}/{filename}")
-async def get_json_file(forget_class: str, filename: str):
+async def get_json_file(
+    request: Request,
+    forget_class: str,
+    filename: str,
+    encoding: str = "rows"
+):
+    _check_encoding(encoding)
     if not filename.endswith('.json'):
         filename = f"{filename}.json"
     
@@ -95,15 +225,37 @@ async def get_json_file(forget_class: str, filename: str):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail=f"File {filename} not found")
     
+    headers = _file_cache_headers(file_path, encoding)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
+        data = await _run_blocking(_load_results_file, file_path, encoding)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
+    
+    if data is None:
+        # Already in the requested encoding: stream the file unparsed
+        return FileResponse(file_path, media_type="application/json", headers=headers)
+    return StreamingResponse(_json_chunks(data), media_type="application/json", headers=headers)
+
+def _load_results_file(file_path: str, encoding: str):
+    """
+    Parsed and converted results, or None when the file already stores
+    its points and attack values in `encoding`.
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    columnar = any(marker in raw for marker in COLUMNAR_MARKERS)
+    if columnar == (encoding == "columnar"):
+        return None
+    return convert_results(json.loads(raw), encoding)
 
 @router.delete("/data/{forget_class}/{filename}")
 async def delete_files(forget_class: str, filename: str):
+    return await _run_blocking(_delete_files, forget_class, filename)
+
+def _delete_files(forget_class: str, filename: str):
     response_messages = []
     
     # JSON delete
@@ -116,6 +268,9 @@ async def delete_files(forget_class: str, filename: str):
         except Exception as e:
             response_messages.append(f"Error deleting JSON file: {str(e)}")
     
+    if forget_class.isdigit():
+        get_results_store().delete(forget_class, json_filename[:-5])
+    
     # PTH delete
     pth_filename = f"{filename}.pth" if not filename.endswith('.pth') else filename
     pth_path = os.path.join('unlearned_models', forget_class, pth_filename)
@@ -132,19 +287,25 @@ async def delete_files(forget_class: str, filename: str):
     return {"messages": response_messages}
 
 @router.get("/image/cifar10/{index}")
-async def get_image(index: int):
+async def get_image(request: Request, index: int):
     if index < 0 or index >= len(x_train):
         raise HTTPException(status_code=404, detail="Image index out of range")
 
-    img_data = x_train[index]
-    
+    # Images only change with the dataset, so they may be cached for a day
+    headers = cache_headers(f'cifar10:{DATASET_VERSION}:{index}', cache_control="public, max-age=86400")
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+
+    img_byte_arr = await _run_blocking(_encode_png, x_train[index])
+
+    return Response(content=img_byte_arr, media_type="image/png", headers=headers)
+
+def _encode_png(img_data):
     img = Image.fromarray(img_data)
     
     img_byte_arr = io.BytesIO()
     img.save(img_byte_arr, format='PNG')
-    img_byte_arr = img_byte_arr.getvalue()
-
-    return Response(content=img_byte_arr, media_type="image/png")
+    return img_byte_arr.getvalue()
 
 @router.get("/trained_models")
 async def get_trained_model():
@@ -163,7 +324,7 @@ async def get_trained_model():
 
 
 @router.get("/image/all_subset/{forget_class}")
-async def get_all_subset_images(forget_class: str):
+async def get_all_subset_images(request: Request, forget_class: str):
     """
     Retrieve 200 CIFAR-10 images for the given forget_class as a single API call.
     
@@ -193,17 +354,19 @@ async def get_all_subset_images(forget_class: str):
     
     # Set up the cache file path in the data/subset directory
     cache_dir = os.path.join("data", "subset", str(class_id))
-    os.makedirs(cache_dir, exist_ok=True)
     cache_file = os.path.join(cache_dir, f"{class_id}_base64.json")
 
-    # If cached file exists, load and return it
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cached_data = json.load(f)
-            return cached_data
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error reading cached file: {str(e)}")
+    # Build the cached file on first use, then stream it as is
+    if not os.path.exists(cache_file):
+        await _run_blocking(_build_subset_images, class_id, cache_file)
+
+    headers = _file_cache_headers(cache_file)
+    if is_not_modified(request, headers):
+        return not_modified(headers)
+    return FileResponse(cache_file, media_type="application/json", headers=headers)
+
+def _build_subset_images(class_id: int, cache_file: str):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
 
     # Global variables x_train and y_train are assumed to be loaded via load_cifar10_data() at startup
     global x_train, y_train
@@ -232,13 +395,13 @@ async def get_all_subset_images(forget_class: str):
 
     response_data = {"images": images_data}
 
-    # Cache the result on disk for future requests
+    # Cache the result on disk for future requests (atomically, as requests may race)
     try:
-        with open(cache_file, "w", encoding="utf-8") as f:
+        tmp_file = f"{cache_file}.{os.getpid()}.{id(response_data)}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(response_data, f)
+        os.replace(tmp_file, cache_file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving cached file: {str(e)}")
 
-    return response_data
-
 
@@ -7,7 +7,8 @@ import torch.optim as optim
 from app.threads import UnlearningGAThread
 from app.models import get_resnet18
 from app.utils.helpers import set_seed
-from app.utils.data_loader import get_data_loaders
+from app.utils.data_loader import get_data_loaders, create_data_loader
+from app.utils.class_index import get_class_index
 from app.config import (
 	MOMENTUM, 
 	WEIGHT_DECAY, 
@@ -55,16 +56,14 @@ async def unlearning_GA(request, status, base_weights_path):
         batch_size=request.batch_size,
         augmentation=AUGMENTATION
     )
+    class_index = get_class_index()
     
-    forget_indices = [
-        i for i, (_, label) in enumerate(train_set)
-        if label == request.forget_class
-    ]
+    forget_indices = class_index.forget_indices(request.forget_class)
     forget_subset = torch.utils.data.Subset(
         dataset=train_set, 
         indices=forget_indices
     )
-    forget_loader = torch.utils.data.DataLoader(
+    forget_loader = create_data_loader(
         dataset=forget_subset, 
         batch_size=request.batch_size, 
         shuffle=True
@@ -8,13 +8,15 @@ import torch.optim as optim
 from app.threads import UnlearningGASLFTV2Thread
 from app.models import get_resnet18
 from app.utils.helpers import set_seed
-from app.utils.data_loader import get_data_loaders
+from app.utils.data_loader import get_data_loaders, create_data_loader
+from app.utils.class_index import get_class_index
 from app.config import (
     MOMENTUM,
     WEIGHT_DECAY,
     DECREASING_LR,
     UNLEARN_SEED,
-    GPU_ID
+    GPU_ID,
+    EVALUATION_BATCH_SIZE
 )
 
 def create_second_logit_dataset(model, forget_loader, device):
@@ -92,32 +94,27 @@ async def unlearning_GA_SL_FT_V2(request, status, base_weights_path):
         batch_size=request.batch_size,
         augmentation=True
     )
+    class_index = get_class_index()
 
     # Create retain loader for FT (excluding forget class)
-    retain_indices = [
-        i for i, (_, label) in enumerate(train_set)
-        if label != request.forget_class
-    ]
+    retain_indices = class_index.retain_indices(request.forget_class)
     retain_subset = torch.utils.data.Subset(
         dataset=train_set,
         indices=retain_indices
     )
-    retain_loader = torch.utils.data.DataLoader(
+    retain_loader = create_data_loader(
         dataset=retain_subset,
         batch_size=mixed_batch_size,
         shuffle=True
     )
 
     # Create forget loader for GA (only forget class)
-    forget_indices = [
-        i for i, (_, label) in enumerate(train_set)
-        if label == request.forget_class
-    ]
+    forget_indices = class_index.forget_indices(request.forget_class)
     forget_subset = torch.utils.data.Subset(
         dataset=train_set,
         indices=forget_indices
     )
-    forget_loader = torch.utils.data.DataLoader(
+    forget_loader = create_data_loader(
         dataset=forget_subset,
         batch_size=ga_batch_size,
         shuffle=True
@@ -144,11 +141,16 @@ async def unlearning_GA_SL_FT_V2(request, status, base_weights_path):
         combined_labels.append(label)  # label is already int from .item()
         combined_types.append(0)  # 0 for SL
     
-    # Add retain data (marked as FT type) 
-    for inputs, labels in retain_subset:
-        combined_data.append(inputs)
-        combined_labels.append(labels)  # labels is already int
-        combined_types.append(1)  # 1 for FT
+    # Add retain data (marked as FT type), augmented once in fixed-size chunks
+    retain_chunk_loader = create_data_loader(
+        dataset=retain_subset,
+        batch_size=EVALUATION_BATCH_SIZE,
+        num_workers=0
+    )
+    for retain_inputs, retain_labels in retain_chunk_loader:
+        combined_data.extend(retain_inputs)
+        combined_labels.extend(retain_labels.tolist())
+        combined_types.extend([1] * len(retain_labels))  # 1 for FT
     
     # Create combined dataset
     combined_dataset = torch.utils.data.TensorDataset(
@@ -7,7 +7,8 @@ import torch.optim as optim
 from app.threads import UnlearningRetrainThread
 from app.models import get_resnet18
 from app.utils.helpers import set_seed
-from app.utils.data_loader import get_data_loaders
+from app.utils.data_loader import get_data_loaders, create_data_loader
+from app.utils.class_index import get_class_index
 from app.utils.visualization import (
 	compute_umap_embedding,
 )
@@ -42,14 +43,12 @@ async def unlearning_retrain(request, status):
         batch_size=request.batch_size,
         augmentation=True
     )
+    class_index = get_class_index()
     
     # Create dataset excluding the forget class
-    indices = [
-        i for i, (_, label) in enumerate(train_set) 
-        if label != request.forget_class
-    ]
+    indices = class_index.retain_indices(request.forget_class)
     subset = torch.utils.data.Subset(train_set, indices)
-    unlearning_loader = torch.utils.data.DataLoader(
+    unlearning_loader = create_data_loader(
         dataset=subset,
         batch_size=request.batch_size,
         shuffle=True
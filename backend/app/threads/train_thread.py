@@ -3,11 +3,14 @@ import asyncio
 import time
 import sys
 import traceback
-import matplotlib.pyplot as plt
 import os
 
+from app.config import PLOT_TRAINING_CURVES
 from app.utils.helpers import save_model
+from app.utils.epoch_plotting import plot_accuracy_curves
+from app.utils.plot_service import submit_plot
 from app.utils.evaluation import evaluate_model
+from app.utils.metrics import MetricsAccumulator
 
 class TrainingThread(threading.Thread):
     def __init__(self, 
@@ -71,11 +74,7 @@ class TrainingThread(threading.Thread):
 
         for epoch in range(self.epochs):
             self.model.train()
-            running_loss = 0.0
-            correct = 0
-            total = 0
-            class_correct = [0] * 10
-            class_total = [0] * 10
+            metrics = MetricsAccumulator(num_classes=10, device=self.device)
             for i, (inputs, labels) in enumerate(self.train_loader):
                 if self.stopped():
                     self.status.is_training = False
@@ -89,25 +88,13 @@ class TrainingThread(threading.Thread):
                 loss.backward()
                 self.optimizer.step()
 
-                running_loss += loss.item()
-                _, predicted = outputs.max(1)
-                total += labels.size(0)
-                correct += predicted.eq(labels).sum().item()
-                
-                c = (predicted == labels).squeeze()
-                for i in range(labels.size(0)):
-                    label = labels[i]
-                    class_correct[label] += c[i].item()
-                    class_total[label] += 1
+                metrics.update(outputs, labels, loss=loss)
             
             self.scheduler.step()
-            train_loss = running_loss / len(self.train_loader)
-            train_accuracy = correct / total
-            train_class_accuracies = {
-                i: (class_correct[i] / class_total[i] 
-                    if class_total[i] > 0 else 0) 
-                for i in range(10)
-            }
+            train_metrics = metrics.compute()
+            train_loss = train_metrics["loss"]
+            train_accuracy = train_metrics["accuracy"]
+            train_class_accuracies = train_metrics["class_accuracies"]
             
             # Evaluate on test set
             (
@@ -176,23 +163,16 @@ class TrainingThread(threading.Thread):
         print(f"\nTotal training time: {total_training_time:.1f} seconds ({total_training_time/60:.1f} minutes)")
         print()
         
-        # Plot and save accuracy curves
-        plt.figure(figsize=(10, 6))
-        plt.plot(range(1, self.epochs + 1), train_accuracies, label='Train Accuracy')
-        plt.plot(range(1, self.epochs + 1), test_accuracies, label='Test Accuracy')
-        plt.xlabel('Epoch')
-        plt.ylabel('Accuracy')
-        plt.title(f'Training Progress - {self.model_name} on {self.dataset_name}')
-        plt.legend()
-        plt.grid(True)
-        
-        # Create directory if it doesn't exist
-        os.makedirs('static/plots', exist_ok=True)
-        
-        # Save the plot
+        # Plot and save accuracy curves (rendered by the plot service)
         plot_filename = f'accuracy_plot_{self.model_name}_{self.dataset_name}.png'
-        plt.savefig(f'static/plots/{plot_filename}')
-        plt.close()
+        submit_plot(
+            plot_accuracy_curves,
+            [float(acc) for acc in train_accuracies],
+            [float(acc) for acc in test_accuracies],
+            f'Training Progress - {self.model_name} on {self.dataset_name}',
+            os.path.join('static/plots', plot_filename),
+            enabled=PLOT_TRAINING_CURVES
+        )
         
         save_model(
             model=self.model, 
@@ -5,15 +5,13 @@ from app.utils.helpers import (
 	format_distribution
 )
 from app.utils.evaluation import (
-	calculate_cka_similarity,
-	evaluate_model_with_distributions, 
-	get_layer_activations_and_predictions
+	calculate_cka_similarity
 )
 from app.utils.visualization import compute_umap_embedding
 from app.config.settings import (
 	MAX_GRAD_NORM
 )
-from app.utils.attack import process_attack_metrics
+from app.utils.fused_evaluation import evaluate_unlearned_model
 from app.utils.thread_base import BaseUnlearningThread
 from app.utils.thread_operations import (
 	setup_umap_subset,
@@ -385,18 +383,20 @@ class UnlearningGASLFTThread(BaseUnlearningThread):
         # Evaluate on train set
         self.status.progress = "Evaluating Train Set"
         print("Start Train set evaluation")
+        evaluation = await evaluate_unlearned_model(
+            model=self.model,
+            criterion=self.criterion,
+            device=self.device,
+            forget_class=self.request.forget_class,
+            umap_indices=selected_indices,
+        )
         (
             train_loss,
             _,
             train_class_accuracies, 
             train_label_dist, 
             train_conf_dist
-        ) = await evaluate_model_with_distributions (
-            model=self.model, 
-            data_loader=self.train_loader,
-            criterion=self.criterion, 
-            device=self.device,
-        )
+        ) = evaluation["train"]
         
         unlearn_accuracy = train_class_accuracies[self.request.forget_class]
         remain_accuracy = round(
@@ -424,12 +424,7 @@ class UnlearningGASLFTThread(BaseUnlearningThread):
             test_class_accuracies, 
             test_label_dist, 
             test_conf_dist
-        ) = await evaluate_model_with_distributions(
-            model=self.model, 
-            data_loader=self.test_loader, 
-            criterion=self.criterion, 
-            device=self.device,
-        )
+        ) = evaluation["test"]
 
         # Update test evaluation status for remain classes only
         self.status.p_test_loss = test_loss
@@ -448,62 +443,22 @@ class UnlearningGASLFTThread(BaseUnlearningThread):
         # UMAP and activation calculation
         self.status.progress = "Computing UMAP"
         
-        print("Computing layer activations")
-        (
-            activations, 
-            predicted_labels, 
-            probs, 
-        ) = await get_layer_activations_and_predictions(
-            model=self.model,
-            data_loader=umap_subset_loader,
-            device=self.device,
-        )
-        print(f"Layer activations computed at {time.time() - start_time:.3f} seconds")
+        activations, predicted_labels, probs, forget_labels = evaluation["umap"]
 
         # UMAP embedding computation
         print("Computing UMAP embedding")
-        forget_labels = torch.tensor([label == self.request.forget_class for _, label in umap_subset])
         umap_embedding = await compute_umap_embedding(
             activation=activations, 
             labels=predicted_labels, 
             forget_class=self.request.forget_class,
-            forget_labels=forget_labels
+            forget_labels=forget_labels,
+            device=self.device
         )
         print(f"UMAP embedding computed in {time.time() - start_time:.3f}s")
         
-        # Process attack metrics using the same umap_subset_loader (for UI)
-        print("Processing attack metrics on UMAP subset")
-        values, attack_results, _ = await process_attack_metrics(
-            model=self.model, 
-            data_loader=umap_subset_loader, 
-            device=self.device, 
-            forget_class=self.request.forget_class,
-            create_plots=False  # No plots for UI data
-        )
-        
-        # Calculate Privacy Score on full dataset for final results
-        print("Calculating Privacy Score on full dataset")
-        _, _, final_fqs = await process_attack_metrics(
-            model=self.model, 
-            data_loader=self.train_loader, 
-            device=self.device, 
-            forget_class=self.request.forget_class,
-            create_plots=False
-        )
-        
-        # Generate distribution plots on full forget class data (for analysis)
-        print("Generating distribution plots on full forget class data")
-        from app.utils.attack_full_dataset import calculate_model_metrics
-        await calculate_model_metrics(
-            model=self.model,
-            data_loader=self.train_loader,
-            device=self.device,
-            forget_class=self.request.forget_class,
-            t1=2.0,
-            t2=1.0,
-            create_plots=True,
-            model_name="Unlearn"
-        )
+        # Attack values on the UMAP subset (for UI) and Privacy Score on the full forget class
+        values, attack_results = evaluation["attack"]
+        final_fqs = evaluation["fqs"]
 
         # Compute CKA similarity
         self.status.progress = "Calculating CKA Similarity"
@@ -2,26 +2,18 @@ import threading
 import asyncio
 import torch
 import time
-import json
-import os
 import uuid
 
 from app.utils.evaluation import (
-	evaluate_model_with_distributions, 
-	get_layer_activations_and_predictions, 
 	calculate_cka_similarity,
 )
-from app.utils.attack import process_attack_metrics
+from app.utils.fused_evaluation import evaluate_unlearned_model
 from app.utils.visualization import compute_umap_embedding
-from app.utils.helpers import (
-	format_distribution, 
-	compress_prob_array, 
-	save_model
-)
-from app.config import (
-	UMAP_DATA_SIZE, 
-	UMAP_DATASET, 
-	UNLEARN_SEED
+from app.utils.helpers import format_distribution
+from app.utils.thread_operations import (
+	setup_umap_subset,
+	prepare_detailed_results,
+	save_results_and_model
 )
 
 class UnlearningCustomThread(threading.Thread):
@@ -84,23 +76,8 @@ class UnlearningCustomThread(threading.Thread):
         self.status.method = "Custom"
         self.status.recent_id = uuid.uuid4().hex[:4]
         
-        dataset = self.train_set if UMAP_DATASET == 'train' else self.test_set
-        
-        targets = torch.tensor(dataset.targets)
-        class_indices = [(targets == i).nonzero().squeeze() for i in range(self.num_classes)]
-        
-        samples_per_class = UMAP_DATA_SIZE // self.num_classes
-        generator = torch.Generator()
-        generator.manual_seed(UNLEARN_SEED)
-        
-        selected_indices = []
-        for indices in class_indices:
-            perm = torch.randperm(len(indices), generator=generator)
-            selected_indices.extend(indices[perm[:samples_per_class]].tolist())
-        
-        umap_subset = torch.utils.data.Subset(dataset, selected_indices)
-        umap_subset_loader = torch.utils.data.DataLoader(
-            umap_subset, batch_size=UMAP_DATA_SIZE, shuffle=False
+        umap_subset, umap_subset_loader, selected_indices = setup_umap_subset(
+            self.train_set, self.test_set, self.num_classes
         )
         
         start_time = time.time()
@@ -110,6 +87,13 @@ class UnlearningCustomThread(threading.Thread):
         # Evaluate on train set
         self.status.progress = "Evaluating Train Set"
         print("Start Train set evaluation")
+        evaluation = await evaluate_unlearned_model(
+            model=self.model,
+            criterion=self.criterion,
+            device=self.device,
+            forget_class=self.forget_class,
+            umap_indices=selected_indices,
+        )
 
         if self.stopped():
             self.status.is_unlearning = False
@@ -122,12 +106,7 @@ class UnlearningCustomThread(threading.Thread):
             train_class_accuracies, 
             train_label_dist, 
             train_conf_dist
-        ) = await evaluate_model_with_distributions (
-            model=self.model, 
-            data_loader=self.train_loader,
-            criterion=self.criterion, 
-            device=self.device,
-        )
+        ) = evaluation["train"]
 
         # Update training evaluation status for remain classes only
         self.status.p_training_loss = train_loss
@@ -163,12 +142,7 @@ class UnlearningCustomThread(threading.Thread):
             test_class_accuracies, 
             test_label_dist, 
             test_conf_dist
-        ) = await evaluate_model_with_distributions(
-            model=self.model, 
-            data_loader=self.test_loader, 
-            criterion=self.criterion, 
-            device=self.device,
-        )
+        ) = evaluation["test"]
 
         # Update test evaluation status for remain classes only
         self.status.p_test_loss = test_loss
@@ -195,90 +169,28 @@ class UnlearningCustomThread(threading.Thread):
         # UMAP and activation calculation
         self.status.progress = "Computing UMAP"
         
-        print("Computing layer activations")
-        (
-            activations, 
-            predicted_labels, 
-            probs, 
-        ) = await get_layer_activations_and_predictions(
-            model=self.model,
-            data_loader=umap_subset_loader,
-            device=self.device,
-        )
-        print(f"Layer activations computed at {time.time() - start_time:.3f} seconds")
+        activations, predicted_labels, probs, forget_labels = evaluation["umap"]
 
         # UMAP embedding computation
         print("Computing UMAP embedding")
-        forget_labels = torch.tensor([label == self.forget_class for _, label in umap_subset])
         umap_embedding = await compute_umap_embedding(
             activation=activations, 
             labels=predicted_labels, 
             forget_class=self.forget_class,
-            forget_labels=forget_labels
+            forget_labels=forget_labels,
+            device=self.device
         )
         print(f"UMAP embedding computed at {time.time() - start_time:.3f} seconds")
         
-        # Process attack metrics using the same umap_subset_loader (for UI)
-        print("Processing attack metrics on UMAP subset")
-        values, attack_results, fqs = await process_attack_metrics(
-            model=self.model, 
-            data_loader=umap_subset_loader, 
-            device=self.device, 
-            forget_class=self.forget_class,
-            create_plots=False  # No plots for UI data
-        )
+        # Attack values on the UMAP subset (for UI) and Privacy Score on the full forget class
+        values, attack_results = evaluation["attack"]
+        final_fqs = evaluation["fqs"]
         
-        # Calculate Privacy Score on full dataset for final results
-        print("Calculating Privacy Score on full dataset")
-        _, _, final_fqs = await process_attack_metrics(
-            model=self.model, 
-            data_loader=self.train_loader, 
-            device=self.device, 
-            forget_class=self.forget_class,
-            create_plots=False
+        # Detailed results preparation (columnar; decode_points gives the row format)
+        detailed_results = prepare_detailed_results(
+            umap_subset, selected_indices, predicted_labels,
+            umap_embedding, probs, self.forget_class
         )
-        
-        # Generate distribution plots on full forget class data (for analysis)
-        print("Generating distribution plots on full forget class data")
-        from app.utils.attack_full_dataset import calculate_model_metrics
-        await calculate_model_metrics(
-            model=self.model,
-            data_loader=self.train_loader,
-            device=self.device,
-            forget_class=self.forget_class,
-            t1=2.0,
-            t2=1.0,
-            create_plots=True,
-            model_name="Unlearn"
-        )
-        
-        # Detailed results preparation
-        detailed_results = []
-        for i in range(len(umap_subset)):
-            original_index = selected_indices[i]
-            ground_truth = umap_subset.dataset.targets[original_index]
-            is_forget = ground_truth == self.forget_class
-            detailed_results.append([
-                int(ground_truth),                             # gt
-                int(predicted_labels[i]),                      # pred
-                int(original_index),                           # img index
-                1 if is_forget else 0,                         # forget flag as binary
-                round(float(umap_embedding[i][0]), 2),         # x coordinate
-                round(float(umap_embedding[i][1]), 2),         # y coordinate
-                compress_prob_array(probs[i].tolist()),        # compressed probabilities
-            ])
-
-        # Decode comment can be updated to:
-        # function decodeDetailedResults(compressedArray) {
-        #   return {
-        #     gt: compressedArray[0],
-        #     pred: compressedArray[1],
-        #     img: compressedArray[2],
-        #     forget: Boolean(compressedArray[3]),
-        #     xy: [compressedArray[4], compressedArray[5]],
-        #     prob: compressedArray[6]
-        #   };
-        # }
 
         # Test accuracy calculation
         if self.is_training_eval:
@@ -333,19 +245,9 @@ class UnlearningCustomThread(threading.Thread):
             }
         }
 
-        # Save results to JSON file
-        os.makedirs('data', exist_ok=True)
-        forget_class_dir = os.path.join('data', str(self.forget_class))
-        os.makedirs(forget_class_dir, exist_ok=True)
-
-        result_path = os.path.join(forget_class_dir, f'{results["ID"]}.json')
-        with open(result_path, 'w') as f:
-            json.dump(results, f, indent=2)
-
-        save_model(
-            model=self.model, 
-            forget_class=self.forget_class,
-            model_name=self.status.recent_id
+        # Save results to JSON file and model weights
+        result_path = save_results_and_model(
+            results, self.model, self.forget_class, self.status
         )
         
         print(f"Results saved to {result_path}")
@@ -4,6 +4,7 @@ import time
 import sys
 from app.utils.helpers import save_model
 from app.utils.evaluation import evaluate_model
+from app.utils.metrics import MetricsAccumulator
 
 class UnlearningRetrainThread(threading.Thread):
     def __init__(
@@ -75,11 +76,7 @@ class UnlearningRetrainThread(threading.Thread):
             epoch_start_time = time.time()  # Start timing training portion
             
             self.model.train()
-            running_loss = 0.0
-            correct = 0
-            total = 0
-            class_correct = [0] * 10
-            class_total = [0] * 10
+            metrics = MetricsAccumulator(num_classes=10, device=self.device)
 
             # Training with unlearning_loader
             for i, (inputs, labels) in enumerate(self.unlearning_loader):
@@ -95,25 +92,13 @@ class UnlearningRetrainThread(threading.Thread):
                 loss.backward()
                 self.optimizer.step()
 
-                running_loss += loss.item()
-                _, predicted = outputs.max(1)
-                total += labels.size(0)
-                correct += predicted.eq(labels).sum().item()
-                
-                c = (predicted == labels).squeeze()
-                for i in range(labels.size(0)):
-                    label = labels[i]
-                    class_correct[label] += c[i].item()
-                    class_total[label] += 1
+                metrics.update(outputs, labels, loss=loss)
             
             self.scheduler.step()
-            train_loss = running_loss / len(self.unlearning_loader)
-            train_accuracy = correct / total
-            train_class_accuracies = {
-                i: (class_correct[i] / class_total[i] 
-                    if class_total[i] > 0 else 0) 
-                for i in range(10)
-            }
+            train_metrics = metrics.compute()
+            train_loss = train_metrics["loss"]
+            train_accuracy = train_metrics["accuracy"]
+            train_class_accuracies = train_metrics["class_accuracies"]
             
             epoch_training_time = time.time() - epoch_start_time  # Calculate training time
             training_time += epoch_training_time  # Add to total training time
@@ -3,8 +3,10 @@ import numpy as np
 import torch.nn.functional as F
 import matplotlib.pyplot as plt
 from scipy.stats import entropy
-import json
-from datetime import datetime
+
+from app.utils.columnar import encode_attack_values, attack_value_arrays
+from app.utils.forget_evaluation import forget_set_features
+from app.utils.reference_distributions import get_retrain_distribution
 
 # Configuration constants for attack scoring
 ENTROPY_CONFIG = {
@@ -20,25 +22,83 @@ CONFIDENCE_CONFIG = {
 }
 
 def prepare_distribution_data(image_indices, logit_entropies, max_logit_gaps):
-    values = []
-    for idx, entropy, confidence in zip(image_indices, logit_entropies, max_logit_gaps):
-        values.append({
-            "img": idx,
-            "entropy": round(float(entropy), 2),
-            "confidence": round(float(confidence), 2)
-        })
-
+    """Columnar attack values (rounded to 2 decimals) of the forget class samples."""
     return {
-        "values": values
+        "values": encode_attack_values(image_indices, logit_entropies, max_logit_gaps)
+    }
+
+def _fraction_at_or_above(values, thresholds):
+    """Fraction of `values` that are >= each threshold, via one sort."""
+    sorted_values = np.sort(values)
+    below = np.searchsorted(sorted_values, thresholds, side='left')
+    return (len(sorted_values) - below) / len(sorted_values)
+
+def _forgetting_scores(fpr, fnr):
+    """Vectorized forgetting score fq of every (fpr, fnr) pair."""
+    DELTA = 1e-5
+    EPS = 1e-10
+
+    sfp = np.clip(fpr, EPS, 1 - DELTA - EPS)
+    sfn = np.clip(fnr, EPS, 1 - DELTA - EPS)
+    lg1 = np.log(1 - DELTA - sfp) - np.log(sfn)
+    lg2 = np.log(1 - DELTA - sfn) - np.log(sfp)
+    epsilon = np.maximum(0, np.minimum(lg1, lg2))
+    fq = 2 ** (-epsilon)
+
+    fq = np.where((fpr >= (1 - DELTA)) | (fnr >= (1 - DELTA)), 1.0, fq)
+    # When no predictions cross the threshold, set forgetting score fq to 0
+    fq = np.where((fpr == 0) & (fnr == 0), 0.0, fq)
+    return fq
+
+def sweep_thresholds(values_unlearn, values_retrain, bins, range_vals, exact=False):
+    """
+    Evaluate every threshold in both directions at once.
+
+    With `exact`, the thresholds are the distinct (clipped) sample values
+    instead of `bins` evenly spaced points of `range_vals`.
+
+    Returns:
+        (thresholds, results) where results maps the positive side
+        ('unlearn' or 'retrain') to a dictionary of "fpr", "fnr" and
+        "attack_score" arrays aligned with thresholds; None when there is
+        nothing to score
+    """
+    if bins < 2 or range_vals[0] >= range_vals[1]:
+        return None
+    if len(values_unlearn) == 0 or len(values_retrain) == 0:
+        return None
+    v_un = np.clip(values_unlearn, range_vals[0], range_vals[1])
+    v_re = np.clip(values_retrain, range_vals[0], range_vals[1])
+
+    if exact:
+        thresholds = np.unique(np.concatenate([v_un, v_re]))
+    else:
+        thresholds = np.linspace(range_vals[0], range_vals[1], bins)
+
+    above = {
+        'unlearn': _fraction_at_or_above(v_un, thresholds),
+        'retrain': _fraction_at_or_above(v_re, thresholds)
     }
 
+    results = {}
+    for direction, other in (('unlearn', 'retrain'), ('retrain', 'unlearn')):
+        fpr = above[other]
+        fnr = 1.0 - above[direction]
+        results[direction] = {
+            "fpr": fpr,
+            "fnr": fnr,
+            "attack_score": 1 - _forgetting_scores(fpr, fnr)
+        }
+    return thresholds, results
+
 def calculate_scores(
         values_unlearn, 
         values_retrain, 
         bins, 
         range_vals, 
         mode='entropy', 
-        direction='unlearn'
+        direction='unlearn',
+        exact=False
     ):
     """
     Calculate attack scores by comparing the unlearn and retrain distributions.
@@ -47,61 +107,40 @@ def calculate_scores(
        - "fpr": false positive rate,
        - "fnr": false negative rate,
        - "attack_score": defined as (1 - forgetting_score)
-    """
-    if bins < 2 or range_vals[0] >= range_vals[1]:
-        return []
-    v_un = np.clip(values_unlearn, range_vals[0], range_vals[1])
-    v_re = np.clip(values_retrain, range_vals[0], range_vals[1])
-    thresholds = np.linspace(range_vals[0], range_vals[1], bins)
 
-    if len(v_un) == 0 or len(v_re) == 0:
+    `direction` names the distribution treated as positives (values at or
+    above the threshold) for both modes. With `exact`, every distinct sample
+    value is used as a threshold instead of the fixed bins.
+    """
+    sweep = sweep_thresholds(values_unlearn, values_retrain, bins, range_vals, exact)
+    if sweep is None:
         return []
+    thresholds, results = sweep
+    return _score_records(thresholds, results['retrain' if direction == 'retrain' else 'unlearn'])
 
-    scores = []
-    DELTA = 1e-5
-    EPS = 1e-10
-
-    for thr_val in thresholds:
-        # Depending on mode and the chosen direction, assign positives and negatives:
-        if mode == 'entropy':
-            if direction == 'unlearn':
-                pos = v_un
-                neg = v_re
-            else:  # direction == 'retrain'
-                pos = v_re
-                neg = v_un
-        else:  # mode == 'confidence'
-            if direction == 'retrain':
-                pos = v_re
-                neg = v_un
-            else:  # direction == 'unlearn'
-                pos = v_un
-                neg = v_re
-
-        tpr = np.mean(pos >= thr_val)
-        fpr = np.mean(neg >= thr_val)
-        fnr = 1.0 - tpr
-
-        if fpr == 0 and fnr == 0:
-            # When no predictions cross the threshold, set forgetting score fq to 0
-            fq = 0
-        elif fpr >= (1 - DELTA) or fnr >= (1 - DELTA):
-            fq = 1
-        else:
-            sfp = np.clip(fpr, EPS, 1 - DELTA - EPS)
-            sfn = np.clip(fnr, EPS, 1 - DELTA - EPS)
-            lg1 = np.log(1 - DELTA - sfp) - np.log(sfn)
-            lg2 = np.log(1 - DELTA - sfn) - np.log(sfp)
-            epsilon = max(0, min(lg1, lg2))
-            fq = 2 ** (-epsilon)
-        attack_score = 1 - fq
-        scores.append({
+def _score_records(thresholds, result):
+    """Per-threshold score dictionaries of one direction of a sweep."""
+    return [
+        {
             "threshold": round(float(thr_val), 3),
             "fpr": round(fpr, 3),
             "fnr": round(fnr, 3),
             "attack_score": round(attack_score, 3)
-        })
-    return scores
+        }
+        for thr_val, fpr, fnr, attack_score in zip(
+            thresholds, result["fpr"], result["fnr"], result["attack_score"]
+        )
+    ]
+
+def best_attack_score(values_unlearn, values_retrain, bins, range_vals, exact=False):
+    """Highest (rounded) attack score over all thresholds and both directions."""
+    sweep = sweep_thresholds(values_unlearn, values_retrain, bins, range_vals, exact)
+    if sweep is None:
+        return 0
+    _, results = sweep
+    return float(max(
+        round(result["attack_score"].max(), 3) for result in results.values()
+    ))
 
 async def process_attack_metrics(
         model, 
@@ -112,116 +151,61 @@ async def process_attack_metrics(
         t2=1.0,
         create_plots=False
     ):
-    from app.utils.evaluation import model_eval_mode
-    
-    logit_entropies = []
-    max_logit_gaps = []
-    image_indices = []
+    # Only the forget class samples of the loader's dataset are forwarded
+    metrics = await forget_set_features(
+        model, device, forget_class, t1, t2,
+        dataset=data_loader.dataset, batch_size=data_loader.batch_size
+    )
+    image_indices = metrics["indices"]
+    logit_entropies = metrics["entropies"]
+    max_logit_gaps = metrics["confidences"]
     
-    with model_eval_mode(model):
-        with torch.no_grad():
-            for batch_idx, data in enumerate(data_loader):
-                images, labels = data[0].to(device), data[1].to(device)
-                outputs = model(images)
-                
-                # Select only those outputs for the forget class
-                forget_mask = (labels == forget_class)
-                if not torch.any(forget_mask):
-                    continue
-                    
-                local_indices = torch.where(forget_mask)[0]
-                batch_start_idx = batch_idx * data_loader.batch_size
-                
-                # Handle both subset and full dataset cases
-                if hasattr(data_loader.dataset, 'indices'):
-                    # For subset datasets (like umap_subset_loader)
-                    original_indices = [data_loader.dataset.indices[batch_start_idx + idx.item()] 
-                                        for idx in local_indices]
-                else:
-                    # For full datasets (like train_loader)
-                    original_indices = [batch_start_idx + idx.item() for idx in local_indices]
-                selected_outputs = outputs[forget_mask]
-
-                # Compute entropy scores
-                scaled_logits_entropy = selected_outputs / t1
-                probs_entropy = F.softmax(scaled_logits_entropy, dim=1)
-                entropies = entropy(probs_entropy.cpu().numpy().T)
+    return score_attack_values(
+        image_indices, logit_entropies, max_logit_gaps, forget_class, t1, t2, create_plots
+    )
 
-                # Compute (logit) confidence scores 
-                scaled_logits_conf = selected_outputs / t2
-                probs_conf = F.softmax(scaled_logits_conf, dim=1).cpu().numpy()
-                max_probs = np.max(probs_conf, axis=1)
-                other_probs = 1 - max_probs
-                confidence_scores = np.log(max_probs + 1e-45) - np.log(other_probs + 1e-45)
-                
-                image_indices.extend(original_indices)
-                logit_entropies.extend(entropies)
-                max_logit_gaps.extend(confidence_scores)
-    
+def score_attack_values(
+        image_indices,
+        logit_entropies,
+        max_logit_gaps,
+        forget_class=5,
+        t1=2.0,
+        t2=1.0,
+        create_plots=False
+    ):
+    """
+    Score precomputed forget-class entropy and confidence values against the
+    retrain distribution from the reference registry. Returns the same
+    (values, attack_results, fqs) tuple as process_attack_metrics.
+    """
     distribution_data = prepare_distribution_data(image_indices, logit_entropies, max_logit_gaps)
-    unlearn_data = {
-        "attack": {
-            "values": distribution_data["values"]
-        }
-    }
-    with open(f"attack{forget_class}.json", "w") as f:
-        json.dump(unlearn_data, f, indent=4)
-    print("add")
-    
-    # Load the pre-saved retrain distribution from JSON.
-    retrain_file = f"data/{forget_class}/a00{forget_class}.json"
-    with open(retrain_file, "r") as f:
-        retrain_raw = json.load(f)
-        # Modified retrain JSON structure: 'attack' below 'values' is a list.
-        retrain_vals = retrain_raw["attack"]["values"]
-        retrain_data = {
-            "values": {
-                "img": [item["img"] for item in retrain_vals],
-                "entropy": [item["entropy"] for item in retrain_vals],
-                "confidence": [item["confidence"] for item in retrain_vals]
-            }
-        }
-    
-    # unlearn_data["attack"]["values"] is a list, so convert it to a dictionary for calculation.
-    unlearn_vals_list = unlearn_data["attack"]["values"]
-    unlearn_data_dict = {
-        "img": [item["img"] for item in unlearn_vals_list],
-        "entropy": [item["entropy"] for item in unlearn_vals_list],
-        "confidence": [item["confidence"] for item in unlearn_vals_list]
-    }
-    
-    # Use unlearn_data_dict for calculation.
-    scores_ent_unlearn = calculate_scores(
-        np.array(unlearn_data_dict["entropy"]),
-        np.array(retrain_data["values"]["entropy"]),
-        ENTROPY_CONFIG["bins"],
-        ENTROPY_CONFIG["range"],
-        mode="entropy",
-        direction="unlearn"
-    )
-    scores_ent_retrain = calculate_scores(
-        np.array(unlearn_data_dict["entropy"]),
-        np.array(retrain_data["values"]["entropy"]),
+    retrain = get_retrain_distribution(forget_class)
+
+    # Score the rounded values exactly as they are reported to the UI
+    _, unlearn_entropies, unlearn_confidences = attack_value_arrays(distribution_data["values"])
+
+    # One threshold sweep per feature scores both directions.
+    entropy_sweep = sweep_thresholds(
+        unlearn_entropies,
+        retrain.entropy,
         ENTROPY_CONFIG["bins"],
-        ENTROPY_CONFIG["range"],
-        mode="entropy",
-        direction="retrain"
+        ENTROPY_CONFIG["range"]
     )
-    scores_conf_retrain = calculate_scores(
-        np.array(unlearn_data_dict["confidence"]),
-        np.array(retrain_data["values"]["confidence"]),
+    confidence_sweep = sweep_thresholds(
+        unlearn_confidences,
+        retrain.confidence,
         CONFIDENCE_CONFIG["bins"],
-        CONFIDENCE_CONFIG["range"],
-        mode="confidence",
-        direction="retrain"
+        CONFIDENCE_CONFIG["range"]
     )
-    scores_conf_unlearn = calculate_scores(
-        np.array(unlearn_data_dict["confidence"]),
-        np.array(retrain_data["values"]["confidence"]),
-        CONFIDENCE_CONFIG["bins"],
-        CONFIDENCE_CONFIG["range"],
-        mode="confidence",
-        direction="unlearn"
+    scores_ent_unlearn, scores_ent_retrain = (
+        [_score_records(entropy_sweep[0], entropy_sweep[1][direction])
+         for direction in ("unlearn", "retrain")]
+        if entropy_sweep is not None else ([], [])
+    )
+    scores_conf_unlearn, scores_conf_retrain = (
+        [_score_records(confidence_sweep[0], confidence_sweep[1][direction])
+         for direction in ("unlearn", "retrain")]
+        if confidence_sweep is not None else ([], [])
     )
     
     def get_best_attack(scores):
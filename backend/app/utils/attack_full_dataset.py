@@ -5,7 +5,11 @@ from scipy.stats import entropy
 from typing import Tuple, List
 import os
 import matplotlib.pyplot as plt
+from app.config import PLOT_DISTRIBUTIONS
 from app.models import get_resnet18
+from app.utils.attack import best_attack_score
+from app.utils.forget_evaluation import forget_set_features
+from app.utils.plot_service import submit_plot
 
 
 def _create_single_distribution_plot(data, title, xlabel, color, filename, mean_value, bins=30, range_vals=None):
@@ -31,7 +35,9 @@ def _create_single_distribution_plot(data, title, xlabel, color, filename, mean_
 
 
 def _create_distribution_plots(entropies, confidences, model_name, forget_class, t1, t2):
-    """Create distribution plots for entropy and confidence."""
+    """Create distribution plots for entropy and confidence (if PLOT_DISTRIBUTIONS)."""
+    if not PLOT_DISTRIBUTIONS:
+        return
     try:
         from datetime import datetime
         
@@ -77,95 +83,23 @@ def _create_distribution_plots(entropies, confidences, model_name, forget_class,
             }
         ]
         
-        # Create plots - DISABLED
-        # saved_paths = []
-        # for config in plot_configs:
-        #     _create_single_distribution_plot(
-        #         config['data'], config['title'], config['xlabel'], 
-        #         config['color'], config['filename'], np.mean(config['data']),
-        #         bins=config['bins'], range_vals=config['range_vals']
-        #     )
-        #     saved_paths.append(config['filename'])
+        # Rendered by the plot service
+        saved_paths = []
+        for config in plot_configs:
+            submit_plot(
+                _create_single_distribution_plot,
+                np.asarray(config['data']), config['title'], config['xlabel'],
+                config['color'], config['filename'], float(np.mean(config['data'])),
+                bins=config['bins'], range_vals=config['range_vals']
+            )
+            saved_paths.append(config['filename'])
         
-        # print(f"{model_name} distribution plots saved: {', '.join(saved_paths)}")
+        print(f"{model_name} distribution plots queued: {', '.join(saved_paths)}")
         
     except Exception as e:
         print(f"Error creating {model_name} distribution plots: {e}")
 
 
-# Import the original attack calculation functions
-def calculate_scores(
-        values_unlearn, 
-        values_retrain, 
-        bins, 
-        range_vals, 
-        mode='entropy', 
-        direction='unlearn'
-    ):
-    """
-    Calculate attack scores by comparing the unlearn and retrain distributions.
-    Returns a list of dictionaries each containing:
-       - "threshold": the threshold value,
-       - "fpr": false positive rate,
-       - "fnr": false negative rate,
-       - "attack_score": defined as (1 - forgetting_score)
-    """
-    if bins < 2 or range_vals[0] >= range_vals[1]:
-        return []
-    v_un = np.clip(values_unlearn, range_vals[0], range_vals[1])
-    v_re = np.clip(values_retrain, range_vals[0], range_vals[1])
-    thresholds = np.linspace(range_vals[0], range_vals[1], bins)
-
-    if len(v_un) == 0 or len(v_re) == 0:
-        return []
-
-    scores = []
-    DELTA = 1e-5
-    EPS = 1e-10
-
-    for thr_val in thresholds:
-        # Depending on mode and the chosen direction, assign positives and negatives:
-        if mode == 'entropy':
-            if direction == 'unlearn':
-                pos = v_un
-                neg = v_re
-            else:  # direction == 'retrain'
-                pos = v_re
-                neg = v_un
-        else:  # mode == 'confidence'
-            if direction == 'retrain':
-                pos = v_re
-                neg = v_un
-            else:  # direction == 'unlearn'
-                pos = v_un
-                neg = v_re
-
-        tpr = np.mean(pos >= thr_val)
-        fpr = np.mean(neg >= thr_val)
-        fnr = 1.0 - tpr
-
-        if fpr == 0 and fnr == 0:
-            # When no predictions cross the threshold, set forgetting score fq to 0
-            fq = 0
-        elif fpr >= (1 - DELTA) or fnr >= (1 - DELTA):
-            fq = 1
-        else:
-            sfp = np.clip(fpr, EPS, 1 - DELTA - EPS)
-            sfn = np.clip(fnr, EPS, 1 - DELTA - EPS)
-            lg1 = np.log(1 - DELTA - sfp) - np.log(sfn)
-            lg2 = np.log(1 - DELTA - sfn) - np.log(sfp)
-            epsilon = max(0, min(lg1, lg2))
-            fq = 2 ** (-epsilon)
-        attack_score = 1 - fq
-        scores.append({
-            "threshold": round(float(thr_val), 3),
-            "fpr": round(fpr, 3),
-            "fnr": round(fnr, 3),
-            "attack_score": round(attack_score, 3)
-        })
-    return scores
-
-
 async def process_attack_metrics_full_dataset(
     unlearn_model, 
     data_loader, 
@@ -250,12 +184,14 @@ async def process_attack_metrics_full_dataset(
 def calculate_attack_scores_original_logic(
     unlearn_metrics: dict, 
     retrain_metrics: dict,
-    use_epoch_bins: bool = False
+    use_epoch_bins: bool = False,
+    exact: bool = False
 ) -> float:
     """
     Apply the SAME attack calculation logic as attack.py but with full dataset.
     Args:
         use_epoch_bins: If True, uses 201 bins for more stable epoch-wise PS calculation
+        exact: If True, every distinct sample value is used as a threshold
     """
     # Configuration - use 201 bins for epoch-wise calculations to reduce noise
     if use_epoch_bins:
@@ -283,60 +219,19 @@ def calculate_attack_scores_original_logic(
     retrain_entropies = np.array(retrain_metrics["entropies"])
     retrain_confidences = np.array(retrain_metrics["confidences"])
     
-    # Calculate 4 attack scores exactly like attack.py
-    scores_ent_unlearn = calculate_scores(
-        unlearn_entropies,
-        retrain_entropies,
-        ENTROPY_CONFIG["bins"],
-        ENTROPY_CONFIG["range"],
-        mode="entropy",
-        direction="unlearn"
-    )
-    scores_ent_retrain = calculate_scores(
-        unlearn_entropies,
-        retrain_entropies,
-        ENTROPY_CONFIG["bins"],
-        ENTROPY_CONFIG["range"],
-        mode="entropy",
-        direction="retrain"
-    )
-    scores_conf_unlearn = calculate_scores(
-        unlearn_confidences,
-        retrain_confidences,
-        CONFIDENCE_CONFIG["bins"],
-        CONFIDENCE_CONFIG["range"],
-        mode="confidence",
-        direction="unlearn"
-    )
-    scores_conf_retrain = calculate_scores(
-        unlearn_confidences,
-        retrain_confidences,
-        CONFIDENCE_CONFIG["bins"],
-        CONFIDENCE_CONFIG["range"],
-        mode="confidence",
-        direction="retrain"
+    # Best of the 4 attacks (both directions of entropy and confidence),
+    # each swept over all thresholds in one vectorized pass
+    best_overall_attack = max(
+        best_attack_score(
+            unlearn_entropies, retrain_entropies,
+            ENTROPY_CONFIG["bins"], ENTROPY_CONFIG["range"], exact
+        ),
+        best_attack_score(
+            unlearn_confidences, retrain_confidences,
+            CONFIDENCE_CONFIG["bins"], CONFIDENCE_CONFIG["range"], exact
+        )
     )
     
-    # Get best attack scores exactly like attack.py
-    def get_best_attack(scores):
-        if not scores:
-            return 0
-        best = max(scores, key=lambda s: s["attack_score"])
-        return best["attack_score"]
-    
-    best_attack_ent_unlearn = get_best_attack(scores_ent_unlearn)
-    best_attack_ent_retrain = get_best_attack(scores_ent_retrain)
-    best_attack_conf_unlearn = get_best_attack(scores_conf_unlearn)
-    best_attack_conf_retrain = get_best_attack(scores_conf_retrain)
-    
-    # Final privacy score calculation exactly like attack.py
-    best_overall_attack = max([
-        best_attack_ent_unlearn,
-        best_attack_ent_retrain, 
-        best_attack_conf_unlearn,
-        best_attack_conf_retrain
-    ])
-    
     privacy_score = 1 - best_overall_attack
     privacy_score = max(0.0, min(1.0, privacy_score))  # Clamp to [0,1]
     
@@ -355,63 +250,20 @@ async def calculate_model_metrics(
 ) -> dict:
     """
     Calculate entropy and confidence metrics for a model on the forget class data.
+    Only the forget class samples of the loader's dataset are forwarded.
     """
-    from app.utils.evaluation import model_eval_mode
-    
-    entropies = []
-    confidences = []
-    indices = []
-    
-    with model_eval_mode(model):
-        with torch.no_grad():
-            for batch_idx, (images, labels) in enumerate(data_loader):
-                images, labels = images.to(device), labels.to(device)
-                outputs = model(images)
-                
-                # Select only forget class samples
-                forget_mask = (labels == forget_class)
-                if not torch.any(forget_mask):
-                    continue
-                
-                local_indices = torch.where(forget_mask)[0]
-                batch_start_idx = batch_idx * data_loader.batch_size
-                
-                # Calculate original indices
-                if hasattr(data_loader.dataset, 'indices'):
-                    # If using Subset
-                    original_indices = [data_loader.dataset.indices[batch_start_idx + idx.item()] 
-                                      for idx in local_indices]
-                else:
-                    # If using full dataset
-                    original_indices = [batch_start_idx + idx.item() for idx in local_indices]
-                
-                selected_outputs = outputs[forget_mask]
-                
-                # Calculate entropy
-                scaled_outputs_entropy = selected_outputs / t1
-                probs_entropy = F.softmax(scaled_outputs_entropy, dim=1)
-                batch_entropies = entropy(probs_entropy.cpu().numpy().T)
-                
-                # Calculate confidence
-                scaled_outputs_conf = selected_outputs / t2
-                probs_conf = F.softmax(scaled_outputs_conf, dim=1).cpu().numpy()
-                max_probs = np.max(probs_conf, axis=1)
-                other_probs = 1 - max_probs
-                batch_confidences = np.log(max_probs + 1e-45) - np.log(other_probs + 1e-45)
-                
-                indices.extend(original_indices)
-                entropies.extend(batch_entropies)
-                confidences.extend(batch_confidences)
+    metrics = await forget_set_features(
+        model, device, forget_class, t1, t2,
+        dataset=data_loader.dataset, batch_size=data_loader.batch_size
+    )
+    entropies = metrics["entropies"]
+    confidences = metrics["confidences"]
     
     # Create visualizations only when requested
     if create_plots and len(entropies) > 0:
         _create_distribution_plots(entropies, confidences, model_name, forget_class, t1, t2)
     
-    return {
-        "indices": indices,
-        "entropies": entropies,
-        "confidences": confidences
-    }
+    return metrics
 
 
 def calculate_privacy_score_from_distributions(
@@ -38,6 +38,18 @@ async def calculate_ps_with_cached_retrain(
         create_plots=False, model_name="Unlearn"
     )
     
+    return calculate_ps_from_metrics(unlearn_metrics, retrain_metrics_cache)
+
+
+def calculate_ps_from_metrics(unlearn_metrics: Dict, retrain_metrics_cache: Dict) -> float:
+    """
+    Privacy Score of precomputed unlearn forget-class metrics against the
+    cached retrain metrics.
+    """
+    if retrain_metrics_cache is None:
+        print("Warning: No retrain metrics cache available, returning default PS")
+        return 0.5
+    
     if len(unlearn_metrics["entropies"]) == 0:
         print("Warning: No unlearn metrics available, returning default PS")
         return 0.5
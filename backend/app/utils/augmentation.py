@@ -0,0 +1,93 @@
+"""
+Batched tensor-level data augmentation.
+
+Replaces the per-sample PIL `RandomCrop(32, padding=4)` and
+`RandomHorizontalFlip()` pipeline with one vectorized gather per batch.
+"""
+import torch
+from torch.utils.data import Dataset
+
+from app.config import UNLEARN_SEED
+from app.utils.dataset_store import CIFAR10_MEAN, CIFAR10_STD
+
+
+class BatchAugmentation:
+    """
+    Random crop with constant padding followed by a random horizontal flip,
+    applied to a whole (N, C, H, W) batch of uint8 or float images.
+
+    Crop offsets and flips are drawn from a private generator seeded with
+    `seed`, so augmented epochs are reproducible under UNLEARN_SEED.
+    """
+
+    def __init__(self, padding=4, flip_prob=0.5, seed=UNLEARN_SEED):
+        self.padding = padding
+        self.flip_prob = flip_prob
+        self.generator = torch.Generator()
+        self.generator.manual_seed(seed)
+        # Zero (black) padding of the PIL pipeline, expressed in normalized space
+        self.float_fill = (
+            -torch.tensor(CIFAR10_MEAN) / torch.tensor(CIFAR10_STD)
+        ).view(1, 3, 1, 1)
+
+    def __call__(self, images):
+        n, c, h, w = images.shape
+        p = self.padding
+
+        padded = images.new_zeros((n, c, h + 2 * p, w + 2 * p))
+        if images.dtype != torch.uint8:
+            padded.copy_(self.float_fill.to(images.device, images.dtype).expand_as(padded))
+        padded[:, :, p:p + h, p:p + w] = images
+
+        offsets_y = torch.randint(0, 2 * p + 1, (n,), generator=self.generator)
+        offsets_x = torch.randint(0, 2 * p + 1, (n,), generator=self.generator)
+        flips = torch.rand(n, generator=self.generator) < self.flip_prob
+
+        rows = offsets_y[:, None] + torch.arange(h)
+        cols = offsets_x[:, None] + torch.arange(w)
+        cols = torch.where(flips[:, None], cols.flip(1), cols)
+
+        batch_idx = torch.arange(n, device=images.device)[:, None, None, None]
+        channel_idx = torch.arange(c, device=images.device)[None, :, None, None]
+        rows = rows.to(images.device)[:, None, :, None]
+        cols = cols.to(images.device)[:, None, None, :]
+        return padded[batch_idx, channel_idx, rows, cols]
+
+
+class AugmentedView(Dataset):
+    """
+    Dataset view whose samples are augmented per batch by loaders built with
+    `create_data_loader`. Indexing it directly returns un-augmented samples.
+    """
+
+    def __init__(self, dataset, augmentation):
+        self.dataset = dataset
+        self.augmentation = augmentation
+
+    @property
+    def targets(self):
+        return self.dataset.targets
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        return self.dataset[index]
+
+
+class AugmentedLoader:
+    """Wrap a DataLoader and augment the inputs of every batch it yields."""
+
+    def __init__(self, loader, augmentation):
+        self.loader = loader
+        self.augmentation = augmentation
+
+    def __iter__(self):
+        for inputs, labels in self.loader:
+            yield self.augmentation(inputs), labels
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
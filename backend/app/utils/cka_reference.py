@@ -0,0 +1,84 @@
+"""
+Persisted per-layer Gram matrices of the CKA reference models.
+
+The original (000X.pth) and retrain (a00X.pth) models never change, yet every
+CKA request used to reload them and forward them over the same fixed subsets.
+Their per-batch, per-layer Gram matrices are now computed once per forget
+class and checkpoint, saved under CKA_REFERENCE_DIR and memory-mapped on
+later requests, so only the candidate model has to be forwarded.
+"""
+import hashlib
+import os
+import threading
+
+import torch
+
+from app.config import CKA_REFERENCE_DIR, DATASET_VERSION
+from app.models import get_resnet18
+from app.utils.streaming_cka import layer_grams
+
+
+def _reference_path(model_path, forget_class, layers, loaders):
+    """Cache file of one reference checkpoint, keyed by its file identity."""
+    stat = os.stat(model_path)
+    digest = hashlib.sha1()
+    digest.update(f'{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    digest.update(f'{DATASET_VERSION}:{",".join(layers)}'.encode())
+    for loader in loaders:
+        digest.update(f'{len(loader.dataset)}:{loader.batch_size};'.encode())
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(CKA_REFERENCE_DIR, str(forget_class), f'{name}_{digest.hexdigest()[:16]}.pt')
+
+
+async def get_reference_grams(model_path, forget_class, loaders, layers, device):
+    """
+    Per-batch Gram stacks of a reference checkpoint over each CKA loader.
+
+    Args:
+        model_path: Path of the reference model weights
+        forget_class: Forget class the CKA subsets were drawn for
+        loaders: Fixed, unshuffled CKA loaders
+        layers: Names of the hooked layers
+        device: Device used when the Grams have to be computed
+
+    Returns:
+        List (one entry per loader) of lists of CPU (L, n, n) tensors, or
+        None if the checkpoint does not exist
+    """
+    if not os.path.exists(model_path):
+        print(f"Reference model not found at {model_path}")
+        return None
+
+    cache_path = _reference_path(model_path, forget_class, layers, loaders)
+    if os.path.exists(cache_path):
+        print(f"Loading cached CKA reference Grams from {cache_path}")
+        return torch.load(cache_path, mmap=True, weights_only=True)
+
+    print(f"Computing CKA reference Grams for {model_path}")
+    model = get_resnet18().to(device)
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    model.eval()
+
+    grams = []
+    for loader in loaders:
+        grams.append([
+            layer_grams(model, inputs.to(device), layers).cpu()
+            for inputs, _ in loader
+        ])
+
+    del model
+    if device.type == "cuda":
+        torch.cuda.empty_cache()
+
+    # Drop stale entries of the same checkpoint name
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = os.path.basename(cache_path).rsplit('_', 1)[0] + '_'
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and entry.endswith('.pt'):
+            os.remove(os.path.join(cache_dir, entry))
+
+    tmp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    torch.save(grams, tmp_path)
+    os.replace(tmp_path, cache_path)
+    return grams
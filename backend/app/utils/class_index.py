@@ -0,0 +1,85 @@
+"""
+Precomputed class-index tables for building retain/forget splits and
+class-balanced subsets without touching the images.
+"""
+import threading
+
+import numpy as np
+import torch
+
+from app.utils.dataset_store import get_dataset_store
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class ClassIndexTable:
+    """Per-class sample indices derived once from a dataset's targets."""
+
+    def __init__(self, targets, num_classes=10):
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.num_classes = num_classes
+
+        # A stable sort keeps the indices of every class in ascending order
+        order = np.argsort(self.targets, kind='stable')
+        counts = np.bincount(self.targets, minlength=num_classes)
+        self._class_indices = np.split(order, np.cumsum(counts)[:-1])
+        self._retain_indices = {}
+        self._balanced_subsets = {}
+
+    def __len__(self):
+        return len(self.targets)
+
+    def class_indices(self, class_idx):
+        """Indices of all samples labelled `class_idx`, ascending."""
+        return self._class_indices[class_idx]
+
+    def forget_indices(self, forget_class):
+        """Indices of the forget class samples, ascending."""
+        return self._class_indices[forget_class]
+
+    def retain_indices(self, forget_class):
+        """Indices of every sample outside the forget class, ascending."""
+        if forget_class not in self._retain_indices:
+            self._retain_indices[forget_class] = np.flatnonzero(self.targets != forget_class)
+        return self._retain_indices[forget_class]
+
+    def balanced_subset_by_class(self, total_samples, seed):
+        """
+        Draw `total_samples // num_classes` samples per class with a seeded
+        torch generator shared across classes, in class order.
+
+        Returns:
+            Dictionary mapping class index to a list of sample indices
+        """
+        key = (total_samples, seed)
+        if key not in self._balanced_subsets:
+            samples_per_class = total_samples // self.num_classes
+            generator = torch.Generator()
+            generator.manual_seed(seed)
+
+            subset = {}
+            for class_idx in range(self.num_classes):
+                indices = self._class_indices[class_idx]
+                perm = torch.randperm(len(indices), generator=generator).numpy()
+                subset[class_idx] = indices[perm[:samples_per_class]].tolist()
+            self._balanced_subsets[key] = subset
+        return self._balanced_subsets[key]
+
+    def balanced_subset(self, total_samples, seed):
+        """Flat list of a class-balanced subset, grouped by class."""
+        subset = self.balanced_subset_by_class(total_samples, seed)
+        return [idx for class_idx in range(self.num_classes) for idx in subset[class_idx]]
+
+
+def get_class_index(train=True):
+    """Return the cached class-index table of the CIFAR-10 train or test split."""
+    split = 'train' if train else 'test'
+    if split not in _tables:
+        with _tables_lock:
+            if split not in _tables:
+                store = get_dataset_store()
+                targets = store.train_targets if train else store.test_targets
+                _tables[split] = ClassIndexTable(targets)
+    return _tables[split]
+
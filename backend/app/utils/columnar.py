@@ -0,0 +1,220 @@
+"""
+Columnar encoding of the per-sample result arrays.
+
+The UMAP `points` and the attack `values` used to be stored as one Python
+list or dict per sample. They are now built in one vectorized step as
+parallel typed columns, each base64-encoded little-endian data:
+
+    {"dtype": "int16", "scale": 0.01, "data": "..."}
+
+Rounded values are stored as fixed-point integers (`scale`), so decoding
+reproduces the rounded floats of the row format exactly. Per-sample class
+probabilities are sparse: only entries above the threshold (and at most
+POINTS_PROB_TOP_K per sample) are kept, in CSR form.
+
+decode_points / decode_attack_values rebuild the row format for clients
+and readers that expect it.
+"""
+import base64
+
+import numpy as np
+
+from app.config import POINTS_PROB_TOP_K
+
+COLUMNAR_FORMAT = 'columnar-v1'
+PROB_THRESHOLD = 0.001
+
+
+def encode_column(values, dtype, scale=None):
+    """
+    Typed column of `values`. With `scale`, values are stored as
+    round(value / scale) in the integer `dtype`; values out of its range
+    fall back to float32.
+    """
+    values = np.asarray(values)
+    if scale is not None:
+        quantized = np.round(values / scale)
+        info = np.iinfo(dtype)
+        if quantized.size and (quantized.min() < info.min or quantized.max() > info.max):
+            return encode_column(values, 'float32')
+        values = quantized
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    column = {"dtype": np.dtype(dtype).name, "data": base64.b64encode(data.tobytes()).decode('ascii')}
+    if scale is not None:
+        column["scale"] = scale
+    return column
+
+
+def decode_column(column):
+    """NumPy array of an encode_column column (floats when scaled)."""
+    dtype = np.dtype(column["dtype"]).newbyteorder('<')
+    values = np.frombuffer(base64.b64decode(column["data"]), dtype=dtype)
+    if "scale" in column:
+        # Dividing by the inverse scale gives the nearest float to the rounded value
+        return values / round(1 / column["scale"])
+    return values.astype(dtype.newbyteorder('='))
+
+
+def is_columnar(value):
+    return isinstance(value, dict) and value.get("format") == COLUMNAR_FORMAT
+
+
+def encode_points(
+    ground_truth,
+    predicted,
+    image_indices,
+    forget_class,
+    embedding,
+    probs,
+    top_k=POINTS_PROB_TOP_K,
+    threshold=PROB_THRESHOLD
+):
+    """
+    Columnar UMAP points.
+
+    Args:
+        ground_truth / predicted / image_indices: Per-sample integer arrays
+        embedding: (N, 2) UMAP coordinates
+        probs: (N, C) class probabilities
+        top_k: Maximum probabilities kept per sample (0 keeps all above
+            the threshold)
+
+    Returns:
+        Dictionary with "format", "n" and "columns"
+    """
+    ground_truth = np.asarray(ground_truth, dtype=np.int64)
+    embedding = np.asarray(embedding, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+
+    keep = probs > threshold
+    if 0 < top_k < probs.shape[1]:
+        ranks = np.argsort(np.argsort(-probs, axis=1, kind='stable'), axis=1)
+        keep &= ranks < top_k
+    rows, classes = np.nonzero(keep)
+    offsets = np.concatenate(([0], np.cumsum(keep.sum(axis=1))))
+
+    return {
+        "format": COLUMNAR_FORMAT,
+        "n": len(ground_truth),
+        "columns": {
+            "gt": encode_column(ground_truth, 'int16'),
+            "pred": encode_column(predicted, 'int16'),
+            "img": encode_column(image_indices, 'int32'),
+            "forget": encode_column(ground_truth == forget_class, 'uint8'),
+            "x": encode_column(embedding[:, 0], 'int16', scale=0.01),
+            "y": encode_column(embedding[:, 1], 'int16', scale=0.01),
+            "prob_offsets": encode_column(offsets, 'int32'),
+            "prob_class": encode_column(classes, 'uint8'),
+            "prob_value": encode_column(probs[rows, classes], 'uint16', scale=0.001)
+        }
+    }
+
+
+def decode_points(points):
+    """Row format [gt, pred, img, forget, x, y, {class: prob}] of columnar points."""
+    if not is_columnar(points):
+        return points
+    columns = {name: decode_column(column) for name, column in points["columns"].items()}
+    offsets = columns["prob_offsets"].tolist()
+    prob_class = columns["prob_class"].astype(str).tolist()
+    prob_value = np.round(columns["prob_value"].astype(np.float64), 3).tolist()
+
+    return [
+        [
+            gt, pred, img, forget, x, y,
+            dict(zip(prob_class[offsets[i]:offsets[i + 1]], prob_value[offsets[i]:offsets[i + 1]]))
+        ]
+        for i, (gt, pred, img, forget, x, y) in enumerate(zip(
+            columns["gt"].tolist(),
+            columns["pred"].tolist(),
+            columns["img"].tolist(),
+            columns["forget"].tolist(),
+            np.round(columns["x"].astype(np.float64), 2).tolist(),
+            np.round(columns["y"].astype(np.float64), 2).tolist()
+        ))
+    ]
+
+
+def points_from_rows(rows, num_classes=10):
+    """Columnar encoding of row-format points (e.g. from older result files)."""
+    if is_columnar(rows):
+        return rows
+    probs = np.zeros((len(rows), num_classes))
+    for i, row in enumerate(rows):
+        for class_idx, prob in row[6].items():
+            probs[i, int(class_idx)] = prob
+    forget = np.array([row[3] for row in rows], dtype=bool)
+    ground_truth = np.array([row[0] for row in rows], dtype=np.int64)
+    # Keep every stored probability and the stored forget flags
+    encoded = encode_points(
+        ground_truth, [row[1] for row in rows], [row[2] for row in rows], -1,
+        np.array([row[4:6] for row in rows], dtype=np.float64).reshape(-1, 2),
+        probs, top_k=0, threshold=0.0
+    )
+    encoded["columns"]["forget"] = encode_column(forget, 'uint8')
+    return encoded
+
+
+def encode_attack_values(image_indices, entropies, confidences):
+    """Columnar attack values, rounded to 2 decimals like the row format."""
+    image_indices = np.asarray(image_indices, dtype=np.int64)
+    return {
+        "format": COLUMNAR_FORMAT,
+        "n": len(image_indices),
+        "columns": {
+            "img": encode_column(image_indices, 'int32'),
+            "entropy": encode_column(entropies, 'int16', scale=0.01),
+            "confidence": encode_column(confidences, 'int16', scale=0.01)
+        }
+    }
+
+
+def attack_value_arrays(values):
+    """(img, entropy, confidence) arrays of columnar or row-format attack values."""
+    if is_columnar(values):
+        columns = values["columns"]
+        return (
+            decode_column(columns["img"]).astype(np.int64),
+            np.round(decode_column(columns["entropy"]).astype(np.float64), 2),
+            np.round(decode_column(columns["confidence"]).astype(np.float64), 2)
+        )
+    return (
+        np.array([item["img"] for item in values], dtype=np.int64),
+        np.array([item["entropy"] for item in values], dtype=np.float64),
+        np.array([item["confidence"] for item in values], dtype=np.float64)
+    )
+
+
+def decode_attack_values(values):
+    """Row format [{"img", "entropy", "confidence"}] of columnar attack values."""
+    if not is_columnar(values):
+        return values
+    img, entropies, confidences = (array.tolist() for array in attack_value_arrays(values))
+    return [
+        {"img": i, "entropy": e, "confidence": c}
+        for i, e, c in zip(img, entropies, confidences)
+    ]
+
+
+def attack_values_from_rows(values):
+    """Columnar encoding of row-format attack values."""
+    if is_columnar(values):
+        return values
+    return encode_attack_values(*attack_value_arrays(values))
+
+
+def convert_results(results, encoding):
+    """
+    Copy of an experiment record with its points and attack values in
+    `encoding` ('rows' or 'columnar').
+    """
+    to_points, to_values = (
+        (decode_points, decode_attack_values) if encoding == 'rows'
+        else (points_from_rows, attack_values_from_rows)
+    )
+    results = dict(results)
+    if "points" in results:
+        results["points"] = to_points(results["points"])
+    if isinstance(results.get("attack"), dict) and "values" in results["attack"]:
+        results["attack"] = dict(results["attack"], values=to_values(results["attack"]["values"]))
+    return results
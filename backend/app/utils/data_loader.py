@@ -1,8 +1,18 @@
+import random
 import numpy as np
 import torch
-from torchvision import datasets, transforms
-from torch.utils.data import DataLoader
-from app.config import UNLEARN_SEED
+from torchvision import datasets
+from torch.utils.data import DataLoader, Subset, ConcatDataset
+from app.config import (
+    UNLEARN_SEED,
+    DATALOADER_NUM_WORKERS,
+    DATALOADER_PREFETCH_FACTOR,
+    DATALOADER_PIN_MEMORY,
+    DATALOADER_PERSISTENT_WORKERS
+)
+from app.utils.dataset_store import get_dataset_store
+from app.utils.augmentation import BatchAugmentation, AugmentedView, AugmentedLoader
+from app.utils.class_index import ClassIndexTable
 
 def load_cifar10_data():
     """Load CIFAR-10 training data with automatic download"""
@@ -15,47 +25,77 @@ def load_cifar10_data():
     
     return x_train, y_train
 
-def get_data_loaders(batch_size, augmentation=False):
-    base_transforms = [
-        transforms.ToTensor(),
-        transforms.Normalize((0.4914, 0.4822, 0.4465), (0.2023, 0.1994, 0.2010))
-    ]
-    
-    train_transform = transforms.Compose(
-        ([
-            transforms.RandomCrop(32, padding=4),
-            transforms.RandomHorizontalFlip(),
-        ] if augmentation else []) + base_transforms
+def seed_worker(worker_id):
+    """Seed numpy and random in each worker from its torch-assigned seed."""
+    worker_seed = torch.initial_seed() % 2**32
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
+
+def create_data_loader(dataset, batch_size, shuffle=False, generator=None, num_workers=None):
+    """
+    Build a DataLoader over `dataset` (or a Subset of it) using the data
+    loading profile from app.config.
+
+    `num_workers` defaults to DATALOADER_NUM_WORKERS, meant for training
+    loaders; evaluation and one-shot loaders pass num_workers=0 so no
+    worker processes are started for a single pass over in-memory tensors.
+
+    Every loader gets a generator seeded with UNLEARN_SEED unless one is
+    given, which fixes both the shuffling order and the per-worker seeds.
+    Datasets backed by an AugmentedView get their random crops and flips
+    applied per batch by the returned loader.
+    """
+    if generator is None:
+        generator = torch.Generator()
+        generator.manual_seed(UNLEARN_SEED)
+
+    if num_workers is None:
+        num_workers = DATALOADER_NUM_WORKERS
+    worker_kwargs = {}
+    if num_workers > 0:
+        worker_kwargs = {
+            'prefetch_factor': DATALOADER_PREFETCH_FACTOR,
+            'persistent_workers': DATALOADER_PERSISTENT_WORKERS,
+            'worker_init_fn': seed_worker,
+        }
+
+    loader = DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=num_workers,
+        pin_memory=DATALOADER_PIN_MEMORY and torch.cuda.is_available(),
+        generator=generator,
+        **worker_kwargs
     )
-    
-    test_transform = transforms.Compose(base_transforms)
-    
-    train_set = datasets.CIFAR10(root='./data', train=True, download=True, transform=train_transform)
-    test_set = datasets.CIFAR10(root='./data', train=False, download=True, transform=test_transform)
+
+    base_dataset = dataset
+    while isinstance(base_dataset, (Subset, ConcatDataset)):
+        if isinstance(base_dataset, Subset):
+            base_dataset = base_dataset.dataset
+        else:
+            base_dataset = base_dataset.datasets[0]
+    if isinstance(base_dataset, AugmentedView):
+        return AugmentedLoader(loader, base_dataset.augmentation)
+    return loader
+
+def get_data_loaders(batch_size, augmentation=False):
+    store = get_dataset_store()
+    test_set = store.test_view()
+    train_set = store.train_view()
+
+    if augmentation:
+        train_set = AugmentedView(train_set, BatchAugmentation(seed=UNLEARN_SEED))
     
     # Create deterministic generator for reproducible shuffling
     g = torch.Generator()
     g.manual_seed(UNLEARN_SEED)
     
-    train_loader = DataLoader(train_set, batch_size=batch_size, shuffle=True, num_workers=0, generator=g)
-    test_loader = DataLoader(test_set, batch_size=100, shuffle=False, num_workers=0)
+    train_loader = create_data_loader(train_set, batch_size=batch_size, shuffle=True, generator=g)
+    test_loader = create_data_loader(test_set, batch_size=100, shuffle=False, num_workers=0)
     print("loaded loaders")
     return train_loader, test_loader, train_set, test_set
 
 def get_fixed_umap_indices(total_samples=2000, seed=UNLEARN_SEED):
-    import torch
     _, y_train = load_cifar10_data()
-    num_classes = 10
-    targets_tensor = torch.tensor(y_train)
-    
-    samples_per_class = total_samples // num_classes
-    generator = torch.Generator()
-    generator.manual_seed(seed)
-    
-    indices_dict = {}
-    for i in range(num_classes):
-        class_indices = (targets_tensor == i).nonzero(as_tuple=False).squeeze()
-        perm = torch.randperm(len(class_indices), generator=generator)
-        indices_dict[i] = class_indices[perm[:samples_per_class]].tolist()
-        
-    return indices_dict
\ No newline at end of file
+    return ClassIndexTable(y_train).balanced_subset_by_class(total_samples, seed)
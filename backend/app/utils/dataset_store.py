@@ -0,0 +1,183 @@
+"""
+Process-wide store of the preprocessed CIFAR-10 train and test sets.
+
+The images are decoded and normalized once per process and kept as contiguous
+tensors. Every job then receives lightweight Dataset views over the same
+storage instead of rebuilding torchvision datasets and running PIL transforms
+on each sample access.
+
+With DATASET_BACKEND = 'mmap' the normalized arrays are converted once to
+.npy files under DATASET_CACHE_DIR and memory-mapped, so every job, DataLoader
+worker and uvicorn worker shares the same page cache instead of holding a
+private decoded copy.
+"""
+import os
+import threading
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torchvision import datasets
+
+from app.config import (
+    DATASET_STORE_DTYPE,
+    DATASET_BACKEND,
+    DATASET_CACHE_DIR
+)
+
+CIFAR10_MEAN = (0.4914, 0.4822, 0.4465)
+CIFAR10_STD = (0.2023, 0.1994, 0.2010)
+_MEAN_CHW = torch.tensor(CIFAR10_MEAN).view(3, 1, 1)
+_STD_CHW = torch.tensor(CIFAR10_STD).view(3, 1, 1)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def normalize_images(images, dtype=torch.float32):
+    """Convert uint8 NHWC images to normalized NCHW tensors (ToTensor + Normalize)."""
+    tensor = torch.from_numpy(np.ascontiguousarray(images)).permute(0, 3, 1, 2).float().div_(255.0)
+    mean = torch.tensor(CIFAR10_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(CIFAR10_STD).view(1, 3, 1, 1)
+    tensor.sub_(mean).div_(std)
+    return tensor.to(dtype).contiguous()
+
+
+class TensorView(Dataset):
+    """Zero-copy Dataset view over a preprocessed image tensor and its labels."""
+
+    def __init__(self, data, targets):
+        self.data = data
+        self.targets = targets
+        self._cast = data.dtype != torch.float32
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, index):
+        image = self.data[index]
+        if self._cast:
+            image = image.float()
+        return image, self.targets[index]
+
+
+class MemmapView(Dataset):
+    """
+    Dataset over a memory-mapped .npy image array written by build_tensor_cache.
+
+    The file is opened lazily in each process, so the view can be pickled into
+    DataLoader workers and every process maps the same pages. uint8 arrays are
+    normalized on access; float16 arrays are already normalized.
+    """
+
+    def __init__(self, path, targets):
+        self.path = path
+        self.targets = targets
+        self._array = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_array'] = None
+        return state
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.load(self.path, mmap_mode='r')
+        return self._array
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, index):
+        image = torch.from_numpy(np.array(self.array[index], dtype=np.float32))
+        if self.array.dtype == np.uint8:
+            image = image.div_(255.0).sub_(_MEAN_CHW).div_(_STD_CHW)
+        return image, self.targets[index]
+
+
+def cache_paths(split, cache_dir=DATASET_CACHE_DIR):
+    """Paths of the cached arrays of one split ('train' or 'test')."""
+    return {
+        'float16': os.path.join(cache_dir, f'{split}_images_f16.npy'),
+        'uint8': os.path.join(cache_dir, f'{split}_images_u8.npy'),
+        'targets': os.path.join(cache_dir, f'{split}_targets.npy'),
+    }
+
+
+def _save_atomic(path, array):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def build_tensor_cache(root='./data', cache_dir=DATASET_CACHE_DIR, overwrite=False):
+    """
+    One-time conversion of CIFAR-10 into memory-mappable .npy files.
+
+    For each split this writes the normalized NCHW images as float16, the raw
+    NCHW images as uint8 and the targets as int64. Files are written to a
+    temporary name and renamed, so concurrent readers never see partial data.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for split in ('train', 'test'):
+        paths = cache_paths(split, cache_dir)
+        if not overwrite and all(os.path.exists(p) for p in paths.values()):
+            continue
+
+        print(f"Writing {split} tensor cache to {cache_dir}...")
+        dataset = datasets.CIFAR10(root=root, train=(split == 'train'), download=True, transform=None)
+        _save_atomic(paths['float16'], normalize_images(dataset.data, torch.float16).numpy())
+        _save_atomic(paths['uint8'], np.ascontiguousarray(dataset.data.transpose(0, 3, 1, 2)))
+        _save_atomic(paths['targets'], np.asarray(dataset.targets, dtype=np.int64))
+
+
+class CIFAR10Store:
+    """Normalized CIFAR-10 train and test sets shared by every job."""
+
+    def __init__(self, root='./data', dtype=DATASET_STORE_DTYPE, backend=DATASET_BACKEND):
+        self.dtype = getattr(torch, dtype)
+        self.backend = backend
+
+        if backend == 'mmap':
+            build_tensor_cache(root)
+            # float16 files are pre-normalized; uint8 files keep full precision
+            variant = 'float16' if self.dtype == torch.float16 else 'uint8'
+            self.train_path = cache_paths('train')[variant]
+            self.test_path = cache_paths('test')[variant]
+            self.train_targets = np.load(cache_paths('train')['targets']).tolist()
+            self.test_targets = np.load(cache_paths('test')['targets']).tolist()
+        else:
+            train_set = datasets.CIFAR10(root=root, train=True, download=True, transform=None)
+            test_set = datasets.CIFAR10(root=root, train=False, download=True, transform=None)
+
+            self.train_images = normalize_images(train_set.data, self.dtype)
+            self.test_images = normalize_images(test_set.data, self.dtype)
+            self.train_targets = list(train_set.targets)
+            self.test_targets = list(test_set.targets)
+
+    def train_view(self):
+        if self.backend == 'mmap':
+            return MemmapView(self.train_path, self.train_targets)
+        return TensorView(self.train_images, self.train_targets)
+
+    def test_view(self):
+        if self.backend == 'mmap':
+            return MemmapView(self.test_path, self.test_targets)
+        return TensorView(self.test_images, self.test_targets)
+
+
+def get_dataset_store():
+    """Return the process-wide dataset store, building it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                print("Building preprocessed CIFAR-10 store...")
+                _store = CIFAR10Store()
+    return _store
+
+
+if __name__ == "__main__":
+    build_tensor_cache(overwrite=True)
@@ -0,0 +1,88 @@
+"""
+Persisted preprocessing of the epoch-wise metrics.
+
+The retrain model's forget class entropies and confidences (for PS) and the
+baseline model's MIA shadow features (for C-MIA and E-MIA) only depend on the
+forget class and the checkpoint they were computed with. Both are stored as
+.npz files under EPOCH_METRICS_CACHE_DIR, keyed by forget class and
+state_dict hash, so repeated jobs on the same class skip the preprocessing.
+"""
+import hashlib
+import os
+
+import numpy as np
+import torch
+
+from app.config import (
+    DATASET_VERSION,
+    EPOCH_METRICS_CACHE_DIR,
+    MIA_SHADOW_SIZE,
+    UNLEARN_SEED
+)
+
+
+def _cache_path(kind, forget_class, model_hash, params):
+    digest = hashlib.sha1(f'{model_hash}:{DATASET_VERSION}:{params}'.encode()).hexdigest()
+    return os.path.join(EPOCH_METRICS_CACHE_DIR, str(forget_class), f'{kind}_{digest[:16]}.npz')
+
+
+def _load(path):
+    try:
+        with np.load(path) as entry:
+            return {name: entry[name] for name in entry.files}
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def _save(path, arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def shadow_indices(class_index, forget_class, size=MIA_SHADOW_SIZE, seed=UNLEARN_SEED):
+    """Seeded shadow sample indices (ascending) outside the forget class."""
+    candidates = class_index.retain_indices(forget_class)
+    generator = torch.Generator()
+    generator.manual_seed(seed + forget_class)
+    perm = torch.randperm(len(candidates), generator=generator).numpy()
+    return np.sort(candidates[perm[:min(size, len(candidates))]])
+
+
+def load_retrain_metrics(forget_class, model_hash, t1=2.0, t2=1.0):
+    """Cached retrain forget class metrics, or None on a miss."""
+    entry = _load(_cache_path('retrain', forget_class, model_hash, f'{t1}:{t2}'))
+    if entry is None:
+        return None
+    return {
+        "indices": entry["indices"].tolist(),
+        "entropies": list(entry["entropies"]),
+        "confidences": list(entry["confidences"])
+    }
+
+
+def save_retrain_metrics(forget_class, model_hash, metrics, t1=2.0, t2=1.0):
+    """Persist the {"indices", "entropies", "confidences"} retrain metrics."""
+    _save(_cache_path('retrain', forget_class, model_hash, f'{t1}:{t2}'), {
+        'indices': np.asarray(metrics["indices"], dtype=np.int64),
+        'entropies': np.asarray(metrics["entropies"], dtype=np.float64),
+        'confidences': np.asarray(metrics["confidences"], dtype=np.float64)
+    })
+
+
+def load_shadow_features(forget_class, model_hash, size=MIA_SHADOW_SIZE, seed=UNLEARN_SEED):
+    """Cached MIA shadow features and shadow indices, or None on a miss."""
+    return _load(_cache_path('shadow', forget_class, model_hash, f'{size}:{seed}'))
+
+
+def save_shadow_features(
+    forget_class,
+    model_hash,
+    shadow_features,
+    size=MIA_SHADOW_SIZE,
+    seed=UNLEARN_SEED
+):
+    """Persist collect_shadow_features output together with its index lists."""
+    _save(_cache_path('shadow', forget_class, model_hash, f'{size}:{seed}'), shadow_features)
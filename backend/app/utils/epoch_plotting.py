@@ -4,12 +4,25 @@ from datetime import datetime
 from typing import Dict, List
 
 
+def epoch_plot_path(
+    method: str,
+    forget_class: int,
+    experiment_id: str,
+    save_dir: str = "epoch_plots"
+) -> str:
+    """Timestamped file path of an epoch-wise plot."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{method}_class_{forget_class}_{experiment_id}_{timestamp}.png"
+    return os.path.join(save_dir, str(forget_class), filename)
+
+
 def plot_epoch_metrics(
     epoch_metrics: Dict[str, List[float]], 
     method: str, 
     forget_class: int, 
     experiment_id: str,
-    save_dir: str = "epoch_plots"
+    save_dir: str = "epoch_plots",
+    filepath: str = None
 ):
     """
     Plot epoch-wise metrics for unlearning methods.
@@ -21,10 +34,11 @@ def plot_epoch_metrics(
         forget_class: The class being forgotten
         experiment_id: Unique experiment identifier
         save_dir: Directory to save plots
+        filepath: Output file; defaults to epoch_plot_path(...)
     """
-    # Create save directory
-    plot_dir = os.path.join(save_dir, str(forget_class))
-    os.makedirs(plot_dir, exist_ok=True)
+    if filepath is None:
+        filepath = epoch_plot_path(method, forget_class, experiment_id, save_dir)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
     
     # Create single plot with all metrics
     fig, ax = plt.subplots(1, 1, figsize=(12, 8))
@@ -76,9 +90,6 @@ def plot_epoch_metrics(
     plt.tight_layout()
     
     # Save plot
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{method}_class_{forget_class}_{experiment_id}_{timestamp}.png"
-    filepath = os.path.join(plot_dir, filename)
     plt.savefig(filepath, dpi=300, bbox_inches='tight')
     plt.close()
     
@@ -141,4 +152,27 @@ def plot_comparison_metrics(
     plt.close()
     
     print(f"Comparison plot saved: {filepath}")
-    return filepath
\ No newline at end of file
+    return filepath
+
+
+def plot_accuracy_curves(
+    train_accuracies: List[float],
+    test_accuracies: List[float],
+    title: str,
+    filepath: str
+):
+    """Train and test accuracy per epoch of a training run."""
+    epochs = range(1, len(train_accuracies) + 1)
+    plt.figure(figsize=(10, 6))
+    plt.plot(epochs, train_accuracies, label='Train Accuracy')
+    plt.plot(epochs, test_accuracies, label='Test Accuracy')
+    plt.xlabel('Epoch')
+    plt.ylabel('Accuracy')
+    plt.title(title)
+    plt.legend()
+    plt.grid(True)
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    plt.savefig(filepath)
+    plt.close()
+    return filepath
@@ -0,0 +1,112 @@
+"""
+Class-stratified subsampling and bootstrap confidence intervals for the
+epoch-wise metrics.
+
+With EPOCH_METRICS_SUBSAMPLE_SIZE > 0 the per-epoch UA, RA, TUA, TRA and PS
+are computed on a fixed, seeded, class-balanced subsample of each split, and
+every value is reported with a percentile bootstrap interval as
+"<metric>_CI_low" / "<metric>_CI_high". Final results always use the full data.
+"""
+import numpy as np
+
+from app.config import (
+    EPOCH_METRICS_SUBSAMPLE_SIZE,
+    EPOCH_METRICS_BOOTSTRAP_SAMPLES,
+    EPOCH_METRICS_CI_LEVEL,
+    UNLEARN_SEED
+)
+from app.utils.class_index import get_class_index
+
+INTERVAL_METRICS = ('UA', 'RA', 'TUA', 'TRA', 'PS')
+
+
+def epoch_subsample_indices(train=True, size=EPOCH_METRICS_SUBSAMPLE_SIZE, seed=UNLEARN_SEED):
+    """
+    Sorted indices of the class-stratified subsample of a split, or None
+    when subsampling is disabled or would cover the whole split.
+    """
+    class_index = get_class_index(train=train)
+    if size <= 0 or size >= len(class_index):
+        return None
+    return np.sort(np.asarray(class_index.balanced_subset(size, seed), dtype=np.int64))
+
+
+def _interval(samples, level=EPOCH_METRICS_CI_LEVEL):
+    alpha = (1 - level) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def accuracy_intervals(
+    train_results,
+    test_results,
+    forget_class,
+    num_samples=EPOCH_METRICS_BOOTSTRAP_SAMPLES,
+    seed=UNLEARN_SEED
+):
+    """
+    Stratified bootstrap intervals of UA, RA, TUA and TRA.
+
+    Resampling the n_c samples of a class with replacement draws its number
+    of correct predictions from Binomial(n_c, accuracy_c), so the per-class
+    counts are sampled directly instead of resampling individual samples.
+
+    Args:
+        train_results / test_results: MetricsAccumulator.compute() outputs
+
+    Returns:
+        Dictionary of "<metric>_CI_low" and "<metric>_CI_high" values
+    """
+    rng = np.random.default_rng(seed)
+    intervals = {}
+
+    for (forget_name, remain_name), results in (
+        (('UA', 'RA'), train_results),
+        (('TUA', 'TRA'), test_results)
+    ):
+        correct = np.asarray(results["class_correct"])
+        total = np.asarray(results["class_total"])
+        rates = np.divide(correct, total, out=np.zeros(len(total)), where=total > 0)
+        draws = rng.binomial(total, rates, size=(num_samples, len(total)))
+        accuracies = np.divide(draws, total, out=np.zeros(draws.shape), where=total > 0)
+
+        remain = [c for c in range(len(total)) if c != forget_class]
+        for name, samples in (
+            (forget_name, accuracies[:, forget_class]),
+            (remain_name, accuracies[:, remain].mean(axis=1))
+        ):
+            intervals[f'{name}_CI_low'], intervals[f'{name}_CI_high'] = _interval(samples)
+
+    return intervals
+
+
+def privacy_score_interval(
+    entropies,
+    confidences,
+    score_fn,
+    num_samples=EPOCH_METRICS_BOOTSTRAP_SAMPLES,
+    seed=UNLEARN_SEED
+):
+    """
+    Bootstrap interval of the privacy score over the forget class samples.
+
+    Args:
+        entropies / confidences: Forget class attack features, aligned
+        score_fn: Callable (entropies, confidences) -> privacy score
+
+    Returns:
+        Dictionary with "PS_CI_low" and "PS_CI_high"
+    """
+    entropies = np.asarray(entropies)
+    confidences = np.asarray(confidences)
+    if len(entropies) == 0:
+        return {'PS_CI_low': 0.5, 'PS_CI_high': 0.5}
+
+    rng = np.random.default_rng(seed)
+    samples = np.empty(num_samples)
+    for i in range(num_samples):
+        rows = rng.integers(0, len(entropies), len(entropies))
+        samples[i] = score_fn(entropies[rows], confidences[rows])
+
+    low, high = _interval(samples)
+    return {'PS_CI_low': low, 'PS_CI_high': high}
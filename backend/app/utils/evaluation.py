@@ -7,11 +7,14 @@ import os
 from datetime import datetime
 from contextlib import contextmanager
 
-from cka import compute_cka
-from torch.utils.data import DataLoader, Subset
-from torchvision import datasets, transforms
+from torch.utils.data import Subset
 from app.config import UMAP_DATA_SIZE
-from app.models import get_resnet18
+from app.utils.dataset_store import get_dataset_store
+from app.utils.class_index import get_class_index
+from app.utils.data_loader import create_data_loader
+from app.utils.metrics import MetricsAccumulator
+from app.utils.cka_reference import get_reference_grams
+from app.utils.streaming_cka import compute_cka
 
 
 @contextmanager
@@ -70,12 +73,8 @@ async def get_layer_activations_and_predictions(
 
 
 # For training and retraining
-async def evaluate_model(model, data_loader, criterion, device):
-    total_loss = 0
-    correct = 0
-    total = 0
-    class_correct = [0] * 10
-    class_total = [0] * 10
+async def evaluate_model(model, data_loader, criterion, device, num_classes=10):
+    metrics = MetricsAccumulator(num_classes=num_classes, device=device)
 
     with model_eval_mode(model):
         with torch.no_grad():
@@ -83,26 +82,17 @@ async def evaluate_model(model, data_loader, criterion, device):
                 images, labels = data[0].to(device), data[1].to(device)
                 outputs = model(images)
                 loss = criterion(outputs, labels)
-                total_loss += loss.item()
-                _, predicted = outputs.max(1)
-                total += labels.size(0)
-                correct += predicted.eq(labels).sum().item()
-
-                c = (predicted == labels).squeeze()
-                for i in range(len(labels)):
-                    label = labels[i]
-                    class_correct[label] += c[i].item()
-                    class_total[label] += 1
-
-    accuracy = correct / total
-    class_accuracies = {
-        i: (class_correct[i] / class_total[i] if class_total[i] > 0 else 0.0)
-        for i in range(10)
-    }
-    avg_loss = total_loss / len(data_loader)
-    print(f"Total correct: {correct}, Total samples: {total}")
+                metrics.update(outputs, labels, loss=loss)
+
+    results = metrics.compute()
+    accuracy = results["accuracy"]
+    class_accuracies = results["class_accuracies"]
+    class_correct = results["class_correct"]
+    class_total = results["class_total"]
+    avg_loss = results["loss"]
+    print(f"Total correct: {sum(class_correct)}, Total samples: {sum(class_total)}")
     print(f"Overall accuracy: {accuracy:.3f}")
-    for i in range(10):
+    for i in range(num_classes):
         print(
             f"Class {i} correct: {class_correct[i]}, "
             f"total: {class_total[i]}, "
@@ -282,22 +272,15 @@ def visualize_logits_distribution(all_logits, class_logits, save_dir="aaai_exp")
     return timestamp
 
 
-async def evaluate_model_with_distributions(model, data_loader, criterion, device):
-    total_loss = 0
-    correct = 0
-    total = 0
-    class_correct = [0] * 10
-    class_total = [0] * 10
-    label_distribution = np.zeros(
-        (10, 10)
-    )  # Ground truth vs predicted class distribution
-    confidence_sum = np.zeros(
-        (10, 10)
-    )  # Ground truth vs sum of confidence for all classes
+async def evaluate_model_with_distributions(model, data_loader, criterion, device, num_classes=10):
+    # Ground truth vs predicted class distribution and vs mean confidence
+    metrics = MetricsAccumulator(
+        num_classes=num_classes, device=device, track_distributions=True
+    )
 
-    # Collect logits for each class
-    all_logits = []  # Store all logits for distribution visualization
-    class_logits = [[] for _ in range(10)]  # Store logits for each class separately
+    # Collect logits for distribution visualization
+    all_logits = []
+    all_labels = []
 
     with model_eval_mode(model):
         with torch.no_grad():
@@ -305,89 +288,38 @@ async def evaluate_model_with_distributions(model, data_loader, criterion, devic
                 images, labels = data[0].to(device), data[1].to(device)
                 outputs = model(images)
                 loss = criterion(outputs, labels)
-                total_loss += loss.item()
 
                 # Collect raw logits before softmax
-                all_logits.append(outputs.cpu().numpy())
-
-                # Collect logits for each class
-                for i in range(labels.size(0)):
-                    label = labels[i].item()
-                    class_logits[label].append(outputs[i].cpu().numpy())
+                all_logits.append(outputs.cpu())
+                all_labels.append(labels.cpu())
 
-                temperature = 1.0
-                scaled_outputs = outputs / temperature
-                probabilities = F.softmax(scaled_outputs, dim=1)
-                _, predicted = torch.max(probabilities, 1)
+                metrics.update(outputs, labels, loss=loss, temperature=1.0)
 
-                total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-                for i in range(labels.size(0)):
-                    label = labels[i].item()
-                    pred = predicted[i].item()
-
-                    class_total[label] += 1
-                    if label == pred:
-                        class_correct[label] += 1
-
-                    label_distribution[label][pred] += 1
-                    confidence_sum[label] += probabilities[i].cpu().numpy()
-
-    # Convert logits to numpy arrays
-    all_logits = np.concatenate(all_logits, axis=0)
-    class_logits = [np.array(logits) for logits in class_logits if len(logits) > 0]
+    # Convert logits to numpy arrays, split per ground-truth class
+    all_logits = torch.cat(all_logits).numpy()
+    all_labels = torch.cat(all_labels).numpy()
+    class_logits = [
+        all_logits[all_labels == i] for i in range(num_classes) if np.any(all_labels == i)
+    ]
 
     # Visualize logits distribution
     # visualize_logits_distribution(all_logits, class_logits)
 
-    accuracy = correct / total
-    class_accuracies = {
-        i: (class_correct[i] / class_total[i] if class_total[i] > 0 else 0.0)
-        for i in range(10)
-    }
-    avg_loss = total_loss / len(data_loader)
-
-    label_distribution = label_distribution / label_distribution.sum(
-        axis=1, keepdims=True
-    )
-    confidence_distribution = confidence_sum / np.array(class_total)[:, np.newaxis]
+    results = metrics.compute()
     return (
-        avg_loss,
-        accuracy,
-        class_accuracies,
-        label_distribution,
-        confidence_distribution,
+        results["loss"],
+        results["accuracy"],
+        results["class_accuracies"],
+        results["label_distribution"],
+        results["confidence_distribution"],
     )
 
 
 async def calculate_cka_similarity(model_after, forget_class, device, batch_size=1000):
-    # Load original model from file
-    model_before = get_resnet18().to(device)
-    original_model_path = f"unlearned_models/{forget_class}/000{forget_class}.pth"
-    print(f"Loading original model from: {original_model_path}")
-    model_before.load_state_dict(torch.load(original_model_path, map_location=device))
-
-    # Create clean data loaders without augmentation for consistent CKA calculation
-    base_transforms = transforms.Compose(
-        [
-            transforms.ToTensor(),
-            transforms.Normalize((0.4914, 0.4822, 0.4465), (0.2023, 0.1994, 0.2010)),
-        ]
-    )
-
-    clean_train_set = datasets.CIFAR10(
-        root="./data", train=True, download=False, transform=base_transforms
-    )
-    clean_test_set = datasets.CIFAR10(
-        root="./data", train=False, download=False, transform=base_transforms
-    )
-
-    train_loader = DataLoader(
-        clean_train_set, batch_size=batch_size, shuffle=False, num_workers=0
-    )
-    test_loader = DataLoader(
-        clean_test_set, batch_size=batch_size, shuffle=False, num_workers=0
-    )
+    # Clean views over the shared preprocessed dataset for consistent CKA calculation
+    store = get_dataset_store()
+    clean_train_set = store.train_view()
+    clean_test_set = store.test_view()
 
     # List of layers to analyze in ResNet18 model
     # conv1: First convolutional layer
@@ -406,14 +338,10 @@ async def calculate_cka_similarity(model_after, forget_class, device, batch_size
         "fc",
     ]
 
-    def filter_loader(loader, is_train=False):
-        targets = loader.dataset.targets
-        targets = (
-            torch.tensor(targets) if not isinstance(targets, torch.Tensor) else targets
-        )
-
-        forget_indices = (targets == forget_class).nonzero(as_tuple=True)[0]
-        other_indices = (targets != forget_class).nonzero(as_tuple=True)[0]
+    def filter_loader(dataset, is_train=False):
+        class_index = get_class_index(train=is_train)
+        forget_indices = torch.from_numpy(class_index.forget_indices(forget_class))
+        other_indices = torch.from_numpy(class_index.retain_indices(forget_class))
 
         if is_train:
             forget_samples = len(forget_indices) // 10
@@ -434,52 +362,29 @@ async def calculate_cka_similarity(model_after, forget_class, device, batch_size
         forget_sampled = forget_indices_sorted[:forget_samples]
         other_sampled = other_indices_sorted[:other_samples]
 
-        forget_loader = DataLoader(
-            Subset(loader.dataset, forget_sampled),
-            batch_size=loader.batch_size,
+        forget_loader = create_data_loader(
+            Subset(dataset, forget_sampled),
+            batch_size=batch_size,
             shuffle=False,
             num_workers=0,
-            pin_memory=True,
         )
 
-        other_loader = DataLoader(
-            Subset(loader.dataset, other_sampled),
-            batch_size=loader.batch_size,
+        other_loader = create_data_loader(
+            Subset(dataset, other_sampled),
+            batch_size=batch_size,
             shuffle=False,
             num_workers=0,
-            pin_memory=True,
         )
 
         return forget_loader, other_loader
 
     forget_class_train_loader, other_classes_train_loader = filter_loader(
-        train_loader, is_train=True
+        clean_train_set, is_train=True
     )
     forget_class_test_loader, other_classes_test_loader = filter_loader(
-        test_loader, is_train=False
+        clean_test_set, is_train=False
     )
 
-    # Load retrain model for additional CKA comparison
-    retrain_model = None
-    retrain_model_path = f"unlearned_models/{forget_class}/a00{forget_class}.pth"
-    retrain_model_loaded = False
-
-    if os.path.exists(retrain_model_path):
-        try:
-            retrain_model = get_resnet18().to(device)
-            retrain_model.load_state_dict(
-                torch.load(retrain_model_path, map_location=device)
-            )
-            retrain_model_loaded = True
-            print(f"Loaded retrain model from {retrain_model_path}")
-        except Exception as e:
-            print(f"Error loading retrain model: {e}")
-            retrain_model = None
-            retrain_model_loaded = False
-    else:
-        print(f"Retrain model not found at {retrain_model_path}")
-        retrain_model_loaded = False
-
     dataloaders = [
         forget_class_train_loader,
         other_classes_train_loader,
@@ -487,12 +392,22 @@ async def calculate_cka_similarity(model_after, forget_class, device, batch_size
         other_classes_test_loader,
     ]
 
-    original_results = compute_cka(
-        model_before, model_after, dataloaders, layers=detailed_layers, device=device
-    )
-    retrain_results = compute_cka(
-        retrain_model, model_after, dataloaders, layers=detailed_layers, device=device
-    )
+    # Reference models never change: their Grams are computed once and cached
+    reference_paths = {
+        "similarity": f"unlearned_models/{forget_class}/000{forget_class}.pth",
+        "similarity_retrain": f"unlearned_models/{forget_class}/a00{forget_class}.pth",
+    }
+    reference_grams = {
+        name: await get_reference_grams(path, forget_class, dataloaders, detailed_layers, device)
+        for name, path in reference_paths.items()
+    }
+    reference_grams = {name: grams for name, grams in reference_grams.items() if grams is not None}
+
+    # Single pass of model_after, compared against every reference per batch
+    with model_eval_mode(model_after):
+        results = compute_cka(
+            model_after, reference_grams, dataloaders, detailed_layers, device
+        )
 
     def format_cka_results(results):
         if results is None:
@@ -502,39 +417,22 @@ async def calculate_cka_similarity(model_after, forget_class, device, batch_size
             for layer_results in results.tolist()
         ]
 
-    # Clean up models to free memory
-    if retrain_model_loaded and retrain_model is not None:
-        del retrain_model
-        torch.cuda.empty_cache() if device.type == "cuda" else None
-
-    # Clean up original model
-    if model_before is not None:
-        del model_before
-        torch.cuda.empty_cache() if device.type == "cuda" else None
-
-    return {
-        "similarity": {
-            "layers": detailed_layers,
-            "train": {
-                "forget_class": format_cka_results(original_results[0]),
-                "other_classes": format_cka_results(original_results[1]),
-            },
-            "test": {
-                "forget_class": format_cka_results(original_results[2]),
-                "other_classes": format_cka_results(original_results[3]),
-            },
-        },
-        "similarity_retrain": {
+    def format_similarity(name):
+        if name not in results:
+            return None
+        return {
             "layers": detailed_layers,
             "train": {
-                "forget_class": format_cka_results(retrain_results[0]),
-                "other_classes": format_cka_results(retrain_results[1]),
+                "forget_class": format_cka_results(results[name][0]),
+                "other_classes": format_cka_results(results[name][1]),
             },
             "test": {
-                "forget_class": format_cka_results(retrain_results[2]),
-                "other_classes": format_cka_results(retrain_results[3]),
+                "forget_class": format_cka_results(results[name][2]),
+                "other_classes": format_cka_results(results[name][3]),
             },
         }
-        if retrain_model_loaded
-        else None,
+
+    return {
+        "similarity": format_similarity("similarity"),
+        "similarity_retrain": format_similarity("similarity_retrain"),
     }
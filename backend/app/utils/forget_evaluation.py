@@ -0,0 +1,133 @@
+"""
+Forget-class-only evaluation.
+
+Privacy score and distribution metrics only look at forget class samples, so
+only those samples are forwarded. They are selected through the class-index
+tables, and every batch carries the original dataset indices of its samples.
+"""
+import numpy as np
+import torch
+import torch.nn.functional as F
+from scipy.stats import entropy
+from torch.utils.data import Dataset, Subset
+
+from app.config import EVALUATION_BATCH_SIZE
+from app.utils.augmentation import AugmentedView
+from app.utils.class_index import get_class_index
+from app.utils.data_loader import create_data_loader
+from app.utils.dataset_store import get_dataset_store
+
+
+class IndexedSubset(Dataset):
+    """Subset whose samples are (image, label, original index) triples."""
+
+    def __init__(self, dataset, indices):
+        self.dataset = dataset
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        original_index = int(self.indices[index])
+        image, label = self.dataset[original_index]
+        return image, label, original_index
+
+
+def attack_features(logits, t1=2.0, t2=1.0):
+    """Entropy (at temperature t1) and logit confidence (at t2) of each row."""
+    probs_entropy = F.softmax(logits / t1, dim=1)
+    entropies = entropy(probs_entropy.numpy().T)
+
+    probs_conf = F.softmax(logits / t2, dim=1).numpy()
+    max_probs = np.max(probs_conf, axis=1)
+    other_probs = 1 - max_probs
+    confidences = np.log(max_probs + 1e-45) - np.log(other_probs + 1e-45)
+    return entropies, confidences
+
+
+def resolve_forget_indices(dataset, forget_class):
+    """
+    Un-augmented base dataset of `dataset` and the indices of its forget
+    class samples, ascending.
+
+    Subsets are resolved to their parent, so the returned indices refer to
+    the parent dataset. The store's train and test views use the cached
+    class-index tables.
+    """
+    subset_indices = None
+    if isinstance(dataset, Subset):
+        subset_indices = np.asarray(dataset.indices, dtype=np.int64)
+        dataset = dataset.dataset
+    if isinstance(dataset, AugmentedView):
+        dataset = dataset.dataset
+
+    store = get_dataset_store()
+    if dataset.targets is store.train_targets:
+        class_indices = get_class_index(train=True).forget_indices(forget_class)
+    elif dataset.targets is store.test_targets:
+        class_indices = get_class_index(train=False).forget_indices(forget_class)
+    else:
+        class_indices = np.flatnonzero(np.asarray(dataset.targets) == forget_class)
+
+    if subset_indices is not None:
+        # Keep the subset's order, as its loader would
+        class_indices = subset_indices[np.isin(subset_indices, class_indices)]
+    return dataset, class_indices
+
+
+async def forget_set_features(
+    model,
+    device,
+    forget_class,
+    t1=2.0,
+    t2=1.0,
+    dataset=None,
+    batch_size=EVALUATION_BATCH_SIZE
+):
+    """
+    Forward only the forget class samples of `dataset` and compute their
+    entropy and confidence attack features.
+
+    Args:
+        model: Model to evaluate
+        device: Device to run the forward passes on
+        forget_class: Class whose samples are evaluated
+        t1: Temperature for the entropy feature
+        t2: Temperature for the confidence feature
+        dataset: Dataset, Subset or augmented view to draw the samples from;
+            defaults to the train split of the dataset store
+        batch_size: Evaluation batch size
+
+    Returns:
+        Dictionary with "indices" (original dataset indices), "entropies"
+        and "confidences", aligned
+    """
+    from app.utils.evaluation import model_eval_mode
+
+    if dataset is None:
+        dataset = get_dataset_store().train_view()
+    base_dataset, forget_indices = resolve_forget_indices(dataset, forget_class)
+
+    indices = []
+    logits = []
+    if len(forget_indices) > 0:
+        loader = create_data_loader(
+            IndexedSubset(base_dataset, forget_indices), batch_size=batch_size, shuffle=False,
+            num_workers=0
+        )
+        with model_eval_mode(model):
+            with torch.no_grad():
+                for images, _, batch_indices in loader:
+                    logits.append(model(images.to(device)).float().cpu())
+                    indices.append(batch_indices)
+
+    if not logits:
+        return {"indices": [], "entropies": [], "confidences": []}
+
+    entropies, confidences = attack_features(torch.cat(logits), t1, t2)
+    return {
+        "indices": torch.cat(indices).tolist(),
+        "entropies": list(entropies),
+        "confidences": list(confidences)
+    }
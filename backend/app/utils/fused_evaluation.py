@@ -0,0 +1,312 @@
+"""
+Single-pass evaluation of an unlearned model.
+
+Every sample of the train and test splits is forwarded once. The logits of
+each split and the penultimate (avgpool) features of the UMAP subset are
+captured in that pass, and every post-unlearning metric is derived from the
+capture: accuracies, label and confidence distributions, entropy and
+confidence attack features, the privacy score and the UMAP inputs.
+"""
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import Subset
+
+from app.config import UMAP_DATASET, EVALUATION_BATCH_SIZE
+from app.utils.attack import score_attack_values
+from app.utils.attack_full_dataset import _create_distribution_plots
+from app.utils.data_loader import create_data_loader
+from app.utils.dataset_store import get_dataset_store
+from app.utils.evaluation import model_eval_mode
+from app.utils.forget_evaluation import attack_features, forget_set_features
+from app.utils.logits_cache import get_logits_cache, state_dict_hash
+from app.utils.metrics import MetricsAccumulator
+
+
+class SplitCapture:
+    """Logits and labels of a whole split, in dataset order, plus the
+    penultimate features of the rows listed in `feature_indices`."""
+
+    def __init__(self, logits, labels, loss, feature_indices=None, features=None):
+        self.logits = logits
+        self.labels = labels
+        self.loss = loss
+        self.feature_indices = feature_indices
+        self.features = features
+
+
+def dataset_targets(dataset):
+    """Labels of a dataset view or of a (nested) Subset of one."""
+    if isinstance(dataset, Subset):
+        return np.asarray(dataset_targets(dataset.dataset))[np.asarray(dataset.indices)]
+    return dataset.targets
+
+
+def _forward_split(model, dataset, device, feature_indices, batch_size):
+    """Forward `dataset` in order; return CPU logits and the kept features."""
+    loader = create_data_loader(dataset, batch_size=batch_size, shuffle=False, num_workers=0)
+
+    positions = None
+    features = None
+    if feature_indices is not None:
+        positions = torch.full((len(dataset),), -1, dtype=torch.long)
+        positions[torch.as_tensor(feature_indices, dtype=torch.long)] = torch.arange(len(feature_indices))
+
+    batch_features = []
+
+    def hook_fn(module, input, output):
+        batch_features.append(output.detach().flatten(1).cpu())
+
+    logits = []
+
+    with model_eval_mode(model):
+        hook = model.avgpool.register_forward_hook(hook_fn) if positions is not None else None
+        try:
+            with torch.no_grad():
+                start = 0
+                for inputs, _ in loader:
+                    outputs = model(inputs.to(device))
+
+                    end = start + outputs.size(0)
+                    if positions is not None:
+                        feats = batch_features.pop()
+                        batch_positions = positions[start:end]
+                        keep = batch_positions >= 0
+                        if features is None:
+                            features = torch.empty(len(feature_indices), feats.size(1))
+                        features[batch_positions[keep]] = feats[keep]
+                    logits.append(outputs.float().cpu())
+                    start = end
+        finally:
+            if hook is not None:
+                hook.remove()
+
+    logits = torch.cat(logits).numpy()
+    if features is not None:
+        features = features.numpy()
+    return logits, features
+
+
+async def capture_split(
+    model,
+    dataset,
+    device,
+    criterion=None,
+    feature_indices=None,
+    batch_size=EVALUATION_BATCH_SIZE,
+    split=None,
+    model_hash=None
+):
+    """
+    Forward every sample of `dataset` once, in order.
+
+    When `split` names a store split ('train' or 'test') the logits cache is
+    checked first and filled on a miss. Logits are cached per checkpoint and
+    split, whatever `feature_indices` is, and features per index set, so
+    any capture of a checkpoint serves later logits-only lookups. Entries
+    are stored at full
+    precision, so a checkpoint yields the same metrics whether or not it
+    was cached.
+
+    Args:
+        model: Model to evaluate
+        dataset: Un-augmented dataset view, or a Subset of one
+        device: Device to run the forward passes on
+        criterion: Loss function; the loss is skipped when None
+        feature_indices: Dataset indices whose avgpool features are kept, in
+            the order the features should be returned
+        batch_size: Evaluation batch size
+        split: Store split of `dataset`, used as part of the cache key
+        model_hash: Precomputed state_dict_hash(model)
+
+    Returns:
+        SplitCapture with CPU logits of shape (N, C)
+    """
+    cache = get_logits_cache() if split is not None else None
+
+    logits = features = None
+    if cache is not None:
+        if model_hash is None:
+            model_hash = state_dict_hash(model)
+        logits_key = cache.key(model_hash, split)
+        entry = cache.get(logits_key)
+        logits = entry['logits'] if entry is not None else None
+        if feature_indices is not None:
+            features_key = cache.key(model_hash, split, feature_indices)
+            entry = cache.get(features_key)
+            features = entry['features'] if entry is not None else None
+
+    cache_hit = logits is not None and (feature_indices is None or features is not None)
+    if cache_hit:
+        print(f"Loaded cached {split} logits for model {model_hash[:8]}")
+    else:
+        logits, features = _forward_split(model, dataset, device, feature_indices, batch_size)
+        if cache is not None:
+            cache.put(logits_key, logits=logits)
+            if feature_indices is not None:
+                cache.put(features_key, features=features)
+
+    logits = torch.from_numpy(logits)
+    labels = torch.as_tensor(dataset_targets(dataset), dtype=torch.long)
+    loss = None
+    if criterion is not None:
+        with torch.no_grad():
+            loss = criterion(logits, labels).item()
+
+    return SplitCapture(
+        logits=logits,
+        labels=labels,
+        loss=loss,
+        feature_indices=feature_indices,
+        features=features,
+    )
+
+
+def split_metrics(capture, num_classes=10):
+    """
+    Accuracy metrics of a captured split.
+
+    Returns:
+        The (loss, accuracy, class_accuracies, label_distribution,
+        confidence_distribution) tuple of evaluate_model_with_distributions
+    """
+    metrics = MetricsAccumulator(num_classes=num_classes, track_distributions=True)
+    metrics.update(capture.logits, capture.labels)
+    results = metrics.compute()
+    return (
+        capture.loss,
+        results["accuracy"],
+        results["class_accuracies"],
+        results["label_distribution"],
+        results["confidence_distribution"],
+    )
+
+
+def umap_inputs(capture, temperature=2.0):
+    """Features, predictions and softened probabilities of the feature rows."""
+    logits = capture.logits[torch.as_tensor(capture.feature_indices, dtype=torch.long)]
+    predictions = logits.argmax(dim=1).numpy()
+    probabilities = F.softmax(logits / temperature, dim=1).numpy()
+    return capture.features, predictions, probabilities
+
+
+async def evaluate_unlearned_model(
+    model,
+    criterion,
+    device,
+    forget_class,
+    umap_indices,
+    t1=2.0,
+    t2=1.0
+):
+    """
+    Evaluate an unlearned model with one forward pass per split.
+
+    Args:
+        model: Unlearned model
+        criterion: Loss function for the reported train and test losses
+        device: Device to run the forward passes on
+        forget_class: Class that was unlearned
+        umap_indices: Indices of the UMAP subset within the UMAP_DATASET split
+        t1: Temperature for the entropy attack feature
+        t2: Temperature for the confidence attack feature
+
+    Returns:
+        Dictionary with
+            "train" / "test": evaluate_model_with_distributions tuples
+            "umap": (activations, predicted_labels, probs, forget_labels)
+            "attack": (values, attack_results) on the UMAP subset, for the UI
+            "fqs": privacy score on the full forget class of the train set
+    """
+    store = get_dataset_store()
+    umap_on_train = UMAP_DATASET == 'train'
+    model_hash = state_dict_hash(model) if get_logits_cache() is not None else None
+
+    train_capture = await capture_split(
+        model, store.train_view(), device, criterion=criterion,
+        feature_indices=umap_indices if umap_on_train else None,
+        split='train', model_hash=model_hash
+    )
+    test_capture = await capture_split(
+        model, store.test_view(), device, criterion=criterion,
+        feature_indices=None if umap_on_train else umap_indices,
+        split='test', model_hash=model_hash
+    )
+    umap_capture = train_capture if umap_on_train else test_capture
+
+    activations, predicted_labels, probs = umap_inputs(umap_capture)
+    umap_index_tensor = torch.as_tensor(umap_indices, dtype=torch.long)
+    forget_labels = umap_capture.labels[umap_index_tensor] == forget_class
+
+    # Attack values on the forget class samples of the UMAP subset (for UI)
+    forget_rows = umap_index_tensor[forget_labels]
+    entropies, confidences = attack_features(umap_capture.logits[forget_rows], t1, t2)
+    values, attack_results, _ = score_attack_values(
+        forget_rows.tolist(), entropies, confidences, forget_class, t1, t2
+    )
+
+    # Privacy score and distribution plots on the full forget class
+    forget_rows = torch.nonzero(train_capture.labels == forget_class).flatten()
+    entropies, confidences = attack_features(train_capture.logits[forget_rows], t1, t2)
+    _, _, final_fqs = score_attack_values(
+        forget_rows.tolist(), list(entropies), list(confidences), forget_class, t1, t2,
+        create_plots=True
+    )
+
+    return {
+        "train": split_metrics(train_capture),
+        "test": split_metrics(test_capture),
+        "umap": (activations, predicted_labels, probs, forget_labels),
+        "attack": (values, attack_results),
+        "fqs": final_fqs,
+    }
+
+
+async def forget_class_metrics(
+    model,
+    device,
+    forget_class,
+    t1=2.0,
+    t2=1.0,
+    create_plots=False,
+    model_name="model"
+):
+    """
+    Entropy and confidence of every forget class sample of the train set.
+
+    The rows are read from the cached train logits when the checkpoint was
+    evaluated before; otherwise only the forget class samples are forwarded
+    (the split is not captured, so nothing is added to the cache).
+
+    Returns:
+        The {"indices", "entropies", "confidences"} dictionary of
+        attack_full_dataset.calculate_model_metrics
+    """
+    cache = get_logits_cache()
+    entry = None
+    if cache is not None:
+        model_hash = state_dict_hash(model)
+        entry = cache.get(cache.key(model_hash, 'train'))
+        if entry is not None:
+            print(f"Loaded cached train logits for model {model_hash[:8]}")
+
+    if entry is None:
+        metrics = await forget_set_features(model, device, forget_class, t1, t2)
+        if create_plots and len(metrics["entropies"]) > 0:
+            _create_distribution_plots(
+                metrics["entropies"], metrics["confidences"], model_name, forget_class, t1, t2
+            )
+        return metrics
+
+    labels = torch.as_tensor(dataset_targets(get_dataset_store().train_view()), dtype=torch.long)
+    forget_rows = torch.nonzero(labels == forget_class).flatten()
+    entropies, confidences = attack_features(torch.from_numpy(entry['logits'])[forget_rows], t1, t2)
+
+    if create_plots and len(entropies) > 0:
+        _create_distribution_plots(entropies, confidences, model_name, forget_class, t1, t2)
+
+    return {
+        "indices": forget_rows.tolist(),
+        "entropies": list(entropies),
+        "confidences": list(confidences)
+    }
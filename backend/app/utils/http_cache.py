@@ -0,0 +1,58 @@
+"""
+Conditional GET support for the data router.
+
+Responses carry a weak ETag (weak, because GZipMiddleware may re-encode the
+body) and a Last-Modified date derived from the files they are built from.
+A request whose If-None-Match (or, without it, If-Modified-Since) matches is
+answered with 304 Not Modified before any file is read.
+"""
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+REVALIDATE = "no-cache"
+
+
+def cache_headers(key, mtime=None, cache_control=REVALIDATE):
+    """
+    Validator headers of a representation.
+
+    Args:
+        key: String that changes whenever the representation does (e.g.
+            path, size, mtime and query parameters)
+        mtime: Modification time (seconds) for Last-Modified, if file-based
+    """
+    headers = {
+        "ETag": f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"',
+        "Cache-Control": cache_control
+    }
+    if mtime is not None:
+        headers["Last-Modified"] = formatdate(mtime, usegmt=True)
+    return headers
+
+
+def _opaque_tag(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, headers):
+    """Whether the client's cached copy (per its conditional headers) is current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque_tag(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque_tag(headers["ETag"]) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
+
+
+def not_modified(headers):
+    return Response(status_code=304, headers=headers)
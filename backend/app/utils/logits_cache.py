@@ -0,0 +1,144 @@
+"""
+Content-addressed on-disk cache of model outputs.
+
+Full-split logits and, in separate entries, the penultimate features of a
+fixed index set are stored as float32 arrays, keyed by a hash of the model's
+state_dict and the evaluation dataset version. Logits are keyed without the
+feature indices, so every capture of a checkpoint shares one logits entry. Re-evaluating a checkpoint that was seen
+before, such as 000X.pth, a00X.pth or a saved experiment sent through
+/unlearn/custom, then skips the forward pass entirely.
+
+The cache directory is kept under LOGITS_CACHE_MAX_BYTES by evicting the
+least recently used entries.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+import torch
+
+from app.config import (
+    DATASET_VERSION,
+    DATASET_STORE_DTYPE,
+    LOGITS_CACHE_ENABLED,
+    LOGITS_CACHE_DIR,
+    LOGITS_CACHE_MAX_BYTES
+)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def state_dict_hash(model):
+    """SHA-1 of a model's (or state_dict's) parameter and buffer contents."""
+    state_dict = model.state_dict() if hasattr(model, 'state_dict') else model
+    digest = hashlib.sha1()
+    for name in sorted(state_dict):
+        tensor = state_dict[name].detach().cpu().contiguous()
+        digest.update(name.encode())
+        digest.update(str(tuple(tensor.shape)).encode())
+        digest.update(str(tensor.dtype).encode())
+        digest.update(tensor.view(-1).view(torch.uint8).numpy().tobytes())
+    return digest.hexdigest()
+
+
+# Outputs are stored at full precision so a cache hit reproduces exactly the
+# metrics of the forward pass that filled it
+CACHE_DTYPE = np.float32
+
+
+class LogitsCache:
+    """LRU-evicted directory of `<key>.npz` files holding float32 outputs."""
+
+    def __init__(self, cache_dir=LOGITS_CACHE_DIR, max_bytes=LOGITS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, model_hash, split, feature_indices=None):
+        """
+        Cache key of one model's logits on one split of the current dataset
+        version or, with `feature_indices`, of its features on those rows.
+        """
+        kind = 'logits' if feature_indices is None else 'features'
+        digest = hashlib.sha1()
+        digest.update(
+            f'{model_hash}:{DATASET_VERSION}:{DATASET_STORE_DTYPE}:'
+            f'{np.dtype(CACHE_DTYPE).name}:{split}:{kind}'.encode()
+        )
+        if feature_indices is not None:
+            digest.update(np.asarray(feature_indices, dtype=np.int64).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.npz')
+
+    def get(self, key):
+        """
+        Load a cache entry.
+
+        Returns:
+            Dictionary of the stored float32 arrays ("logits" or
+            "features"); None on a miss
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                result = {name: entry[name].astype(np.float32) for name in entry.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        # Refresh the access time used for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, **arrays):
+        """Store named arrays as float32, then enforce the size budget."""
+        arrays = {name: np.asarray(array, dtype=CACHE_DTYPE) for name, array in arrays.items()}
+
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.npz'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+def get_logits_cache():
+    """Return the process-wide logits cache, or None when it is disabled."""
+    global _cache
+    if not LOGITS_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LogitsCache()
+    return _cache
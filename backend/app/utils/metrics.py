@@ -0,0 +1,104 @@
+"""
+On-device accumulation of classification metrics.
+"""
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class MetricsAccumulator:
+    """
+    Accumulate loss, per-class accuracy and, optionally, the label and
+    confidence distributions of a classifier over many batches.
+
+    Counters live on `device` and are updated with `bincount` / `index_add_`,
+    so no per-sample host synchronization happens. `compute()` reads them back
+    once.
+    """
+
+    def __init__(self, num_classes=10, device='cpu', track_distributions=False):
+        self.num_classes = num_classes
+        self.device = torch.device(device)
+        self.track_distributions = track_distributions
+        # MPS has no float64 support
+        self.sum_dtype = torch.float32 if self.device.type == 'mps' else torch.float64
+
+        self.loss_sum = torch.zeros((), dtype=self.sum_dtype, device=self.device)
+        self.num_batches = 0
+        self.class_correct = torch.zeros(num_classes, dtype=torch.long, device=self.device)
+        self.class_total = torch.zeros(num_classes, dtype=torch.long, device=self.device)
+        if track_distributions:
+            self.label_counts = torch.zeros(
+                num_classes * num_classes, dtype=torch.long, device=self.device
+            )
+            self.confidence_sum = torch.zeros(
+                num_classes, num_classes, dtype=self.sum_dtype, device=self.device
+            )
+
+    @torch.no_grad()
+    def update(self, outputs, labels, loss=None, temperature=1.0):
+        """
+        Add one batch.
+
+        Args:
+            outputs: Logits of shape (N, num_classes)
+            labels: Ground-truth labels of shape (N,)
+            loss: Scalar batch loss tensor, averaged per batch by compute()
+            temperature: Softmax temperature of the confidence distribution
+        """
+        outputs = outputs.detach()
+        labels = labels.to(outputs.device)
+        predicted = outputs.argmax(dim=1)
+
+        self.class_total += torch.bincount(labels, minlength=self.num_classes)
+        self.class_correct += torch.bincount(
+            labels[predicted == labels], minlength=self.num_classes
+        )
+
+        if loss is not None:
+            self.loss_sum += loss.detach().to(self.sum_dtype)
+            self.num_batches += 1
+
+        if self.track_distributions:
+            self.label_counts += torch.bincount(
+                labels * self.num_classes + predicted,
+                minlength=self.num_classes * self.num_classes
+            )
+            probabilities = F.softmax(outputs / temperature, dim=1)
+            self.confidence_sum.index_add_(0, labels, probabilities.to(self.sum_dtype))
+
+    def compute(self):
+        """
+        Read the counters back to the host.
+
+        Returns:
+            Dictionary with "loss" (mean batch loss), "accuracy",
+            "class_accuracies", "class_correct" and "class_total", plus
+            "label_distribution" and "confidence_distribution" when tracked
+        """
+        class_correct = self.class_correct.cpu().numpy()
+        class_total = self.class_total.cpu().numpy()
+        total = int(class_total.sum())
+
+        results = {
+            "loss": self.loss_sum.item() / self.num_batches if self.num_batches else 0.0,
+            "accuracy": int(class_correct.sum()) / total if total > 0 else 0.0,
+            "class_accuracies": {
+                i: (float(class_correct[i] / class_total[i]) if class_total[i] > 0 else 0.0)
+                for i in range(self.num_classes)
+            },
+            "class_correct": class_correct.tolist(),
+            "class_total": class_total.tolist(),
+        }
+
+        if self.track_distributions:
+            label_distribution = self.label_counts.cpu().numpy().reshape(
+                self.num_classes, self.num_classes
+            ).astype(np.float64)
+            confidence_sum = self.confidence_sum.cpu().numpy().astype(np.float64)
+            results["label_distribution"] = label_distribution / label_distribution.sum(
+                axis=1, keepdims=True
+            )
+            results["confidence_distribution"] = confidence_sum / class_total[:, np.newaxis]
+
+        return results
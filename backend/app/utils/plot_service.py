@@ -0,0 +1,106 @@
+"""
+Off-thread plot rendering.
+
+Figures are rendered by a small process pool whose workers use the Agg
+backend, so jobs do not wait for matplotlib (or hold the GIL while it draws)
+on their critical path. Submission is fire-and-forget; rendering errors are
+printed from the worker's future. If a worker dies the broken pool is
+replaced, and a plot that still cannot be submitted is rendered inline.
+With PLOT_WORKERS = 0 plots are rendered inline, as before.
+
+Render functions must be module-level (picklable) and take only picklable
+arguments, e.g. NumPy arrays and lists rather than tensors.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import PLOT_WORKERS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PLOT_WORKERS,
+                # Forking a process that holds CUDA contexts and worker threads is unsafe
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return _executor
+
+
+def _discard_executor(executor):
+    """Drop `executor` (e.g. broken by a dead worker) so the next call starts a new pool."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_inline(render_fn, *args, **kwargs):
+    try:
+        render_fn(*args, **kwargs)
+    except Exception as e:
+        print(f"Error rendering plot: {e}")
+
+
+def _report_failure(future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        print(f"Error rendering plot: {error}")
+
+
+def submit_plot(render_fn, *args, enabled=True, **kwargs):
+    """
+    Render a figure off the calling thread.
+
+    Args:
+        render_fn: Module-level function that draws and saves the figure
+        enabled: Per-artifact opt-out; nothing is rendered when False
+
+    Returns:
+        Future of the render call, or None when disabled or rendered inline
+    """
+    if not enabled:
+        return None
+
+    if PLOT_WORKERS <= 0:
+        _render_inline(render_fn, *args, **kwargs)
+        return None
+
+    for attempt in range(2):
+        executor = _get_executor()
+        try:
+            future = executor.submit(render_fn, *args, **kwargs)
+        except RuntimeError as e:
+            # BrokenProcessPool, or a pool shut down concurrently
+            print(f"Plot worker pool unavailable ({e}); restarting it")
+            _discard_executor(executor)
+            continue
+        future.add_done_callback(_report_failure)
+        return future
+
+    _render_inline(render_fn, *args, **kwargs)
+    return None
+
+
+def shutdown_plot_service(wait=True):
+    """Stop the rendering workers, by default after pending plots are saved."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -0,0 +1,64 @@
+"""
+Registry of the retrain reference distributions used by the attack metrics.
+
+Each forget class has a retrain model distribution saved at
+data/{fc}/a00{fc}.json. It is parsed once into NumPy arrays and kept in
+memory until the file's size or modification time changes.
+"""
+import json
+import os
+import threading
+
+from app.utils.columnar import attack_value_arrays
+
+_distributions = {}
+_distributions_lock = threading.Lock()
+
+
+class ReferenceDistribution:
+    """Image indices, entropies and confidences of a retrain distribution."""
+
+    def __init__(self, img, entropy, confidence):
+        self.img = img
+        self.entropy = entropy
+        self.confidence = confidence
+
+    def __len__(self):
+        return len(self.img)
+
+
+def retrain_distribution_path(forget_class):
+    """Path of the saved retrain distribution of `forget_class`."""
+    return f"data/{forget_class}/a00{forget_class}.json"
+
+
+def _load(path):
+    with open(path, "r") as f:
+        retrain_vals = json.load(f)["attack"]["values"]
+    img, entropy, confidence = attack_value_arrays(retrain_vals)
+    return ReferenceDistribution(img=img, entropy=entropy, confidence=confidence)
+
+
+def get_retrain_distribution(forget_class):
+    """
+    Return the retrain distribution of `forget_class`, reloading it only when
+    the file changed since the last call.
+
+    Raises:
+        FileNotFoundError: If the distribution has not been saved
+    """
+    path = retrain_distribution_path(forget_class)
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+
+    entry = _distributions.get(forget_class)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    with _distributions_lock:
+        entry = _distributions.get(forget_class)
+        if entry is None or entry[0] != signature:
+            print(f"Loading retrain distribution from {path}")
+            entry = (signature, _load(path))
+            _distributions[forget_class] = entry
+    return entry[1]
@@ -0,0 +1,327 @@
+"""
+Indexed experiment results store.
+
+Every experiment result JSON under data/{forget_class} is mirrored into an
+SQLite database at RESULTS_DB_PATH:
+
+    experiments       one row per experiment with the indexed summary
+                      columns (ID, Method, UA, RA, TUA, TRA, PS, RTE) and the
+                      remaining small fields as a JSON summary
+    experiment_blobs  the large fields (points, CKA, attack values, epoch
+                      metrics), one row per field, loaded only on request
+
+save_results_and_model writes through to the store. The JSON files stay the
+source of truth: sync() re-imports files whose size or mtime changed (e.g.
+downloaded baselines) and drops rows whose file is gone, so listing only
+costs a directory scan and an indexed query.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from app.config import RESULTS_DB_PATH
+from app.utils.columnar import COLUMNAR_FORMAT, convert_results
+
+BLOB_FIELDS = ('cka', 'cka_retrain', 'points', 'attack', 'epoch_metrics')
+SORT_COLUMNS = {
+    'ID': 'id',
+    'Method': 'method',
+    'CreatedAt': 'created_at',
+    'UA': 'ua',
+    'RA': 'ra',
+    'TUA': 'tua',
+    'TRA': 'tra',
+    'PS': 'ps',
+    'RTE': 'rte'
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    forget_class INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    method TEXT,
+    type TEXT,
+    created_at TEXT,
+    ua REAL,
+    ra REAL,
+    tua REAL,
+    tra REAL,
+    ps REAL,
+    rte REAL,
+    summary TEXT NOT NULL,
+    file_size INTEGER,
+    file_mtime_ns INTEGER,
+    PRIMARY KEY (forget_class, id)
+);
+CREATE TABLE IF NOT EXISTS experiment_blobs (
+    forget_class INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (forget_class, id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS experiments_method ON experiments (forget_class, method);
+CREATE INDEX IF NOT EXISTS experiments_ua ON experiments (forget_class, ua);
+CREATE INDEX IF NOT EXISTS experiments_ra ON experiments (forget_class, ra);
+CREATE INDEX IF NOT EXISTS experiments_tua ON experiments (forget_class, tua);
+CREATE INDEX IF NOT EXISTS experiments_tra ON experiments (forget_class, tra);
+CREATE INDEX IF NOT EXISTS experiments_ps ON experiments (forget_class, ps);
+CREATE INDEX IF NOT EXISTS experiments_rte ON experiments (forget_class, rte);
+"""
+
+_results_store = None
+_results_store_lock = threading.Lock()
+
+
+def _number(value):
+    """Numeric summary value, or None for placeholders such as "N/A"."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _compact_json(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _encoded_blob(name, data, encoding):
+    """Stored JSON text of a blob with its per-sample arrays in `encoding`."""
+    if encoding is None or name not in ('points', 'attack'):
+        return data
+    if (f'"format":"{COLUMNAR_FORMAT}"' in data) == (encoding == 'columnar'):
+        return data
+    return _compact_json(convert_results({name: json.loads(data)}, encoding)[name])
+
+
+def _listing_key(forget_class, experiment_id):
+    """Original model first, then the retrained baseline, then by ID."""
+    if experiment_id.startswith(f'000{forget_class}'):
+        return (0, experiment_id)
+    if experiment_id.startswith(f'a00{forget_class}'):
+        return (1, experiment_id)
+    return (2, experiment_id)
+
+
+class ResultsStore:
+    """SQLite index of the experiment results of every forget class."""
+
+    def __init__(self, db_path=RESULTS_DB_PATH, data_dir='data'):
+        self.data_dir = data_dir
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def put(self, forget_class, results, file_path=None, experiment_id=None):
+        """
+        Insert or replace an experiment, recording its JSON file identity.
+        `experiment_id` defaults to results["ID"].
+        """
+        forget_class = int(forget_class)
+        experiment_id = str(results["ID"] if experiment_id is None else experiment_id)
+        summary = {key: value for key, value in results.items() if key not in BLOB_FIELDS}
+        blobs = [
+            (forget_class, experiment_id, name, _compact_json(results[name]))
+            for name in BLOB_FIELDS if name in results
+        ]
+        file_size = file_mtime_ns = None
+        if file_path is not None:
+            stat = os.stat(file_path)
+            file_size, file_mtime_ns = stat.st_size, stat.st_mtime_ns
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM experiment_blobs WHERE forget_class = ? AND id = ?',
+                (forget_class, experiment_id)
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO experiments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    forget_class,
+                    experiment_id,
+                    summary.get("Method"),
+                    summary.get("Type"),
+                    summary.get("CreatedAt"),
+                    _number(summary.get("UA")),
+                    _number(summary.get("RA")),
+                    _number(summary.get("TUA")),
+                    _number(summary.get("TRA")),
+                    # Baseline files name the privacy score "PA"
+                    _number(summary.get("PS", summary.get("PA"))),
+                    _number(summary.get("RTE")),
+                    _compact_json(summary),
+                    file_size,
+                    file_mtime_ns
+                )
+            )
+            self._conn.executemany('INSERT INTO experiment_blobs VALUES (?, ?, ?, ?)', blobs)
+
+    def delete(self, forget_class, experiment_id):
+        forget_class = int(forget_class)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM experiment_blobs WHERE forget_class = ? AND id = ?',
+                (forget_class, experiment_id)
+            )
+            self._conn.execute(
+                'DELETE FROM experiments WHERE forget_class = ? AND id = ?',
+                (forget_class, experiment_id)
+            )
+
+    def sync(self, forget_class):
+        """
+        Reconcile the store with data/{forget_class}: import new or changed
+        JSON files and drop experiments whose file was removed.
+
+        Returns:
+            False if the directory does not exist
+        """
+        forget_class = int(forget_class)
+        data_dir = os.path.join(self.data_dir, str(forget_class))
+        if not os.path.isdir(data_dir):
+            return False
+
+        with self._lock:
+            known = {
+                experiment_id: (file_size, file_mtime_ns)
+                for experiment_id, file_size, file_mtime_ns in self._conn.execute(
+                    'SELECT id, file_size, file_mtime_ns FROM experiments WHERE forget_class = ?',
+                    (forget_class,)
+                )
+            }
+
+        on_disk = set()
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or not entry.is_file():
+                    continue
+                experiment_id = entry.name[:-5]
+                on_disk.add(experiment_id)
+                stat = entry.stat()
+                if known.get(experiment_id) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+                # Files are keyed by name, whatever their "ID" field says
+                self.put(forget_class, results, entry.path, experiment_id)
+
+        for experiment_id in known.keys() - on_disk:
+            self.delete(forget_class, experiment_id)
+        return True
+
+    def _blob_texts(self, forget_class, experiment_ids, include):
+        """Stored JSON text of the `include` fields, as {id: {name: text}}."""
+        include = [name for name in BLOB_FIELDS if name in include]
+        if not include or not experiment_ids:
+            return {}
+        blobs = {}
+        experiment_ids = sorted(experiment_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id, name, data FROM experiment_blobs WHERE forget_class = ? '
+                f'AND id IN ({", ".join("?" * len(experiment_ids))}) '
+                f'AND name IN ({", ".join("?" * len(include))})',
+                (forget_class, *experiment_ids, *include)
+            ).fetchall()
+        for experiment_id, name, data in rows:
+            blobs.setdefault(experiment_id, {})[name] = data
+        return blobs
+
+    def _select(self, forget_class, method=None, sort=None, descending=False, include=()):
+        """(id, summary text, {name: blob text}) of the matching experiments, in order."""
+        forget_class = int(forget_class)
+        query = 'SELECT id, summary FROM experiments WHERE forget_class = ?'
+        params = [forget_class]
+        if method is not None:
+            query += ' AND method = ?'
+            params.append(method)
+        if sort is not None:
+            query += f' ORDER BY {SORT_COLUMNS[sort]} IS NULL, {SORT_COLUMNS[sort]}'
+            query += ' DESC' if descending else ''
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        if sort is None:
+            rows.sort(key=lambda row: _listing_key(forget_class, row[0]))
+
+        blobs = self._blob_texts(forget_class, {experiment_id for experiment_id, _ in rows}, include)
+        return [(experiment_id, summary, blobs.get(experiment_id, {})) for experiment_id, summary in rows]
+
+    def list(self, forget_class, method=None, sort=None, descending=False, include=()):
+        """
+        Experiments of a forget class keyed by ID.
+
+        Args:
+            method: Only experiments of this method
+            sort: Summary column to order by (a SORT_COLUMNS key); defaults
+                to original model, retrained baseline, then ID
+            descending: Reverse the `sort` order
+            include: Large fields (BLOB_FIELDS) to attach to every record
+
+        Returns:
+            OrderedDict mapping experiment ID to its record
+        """
+        records = OrderedDict()
+        for experiment_id, summary, blobs in self._select(
+            forget_class, method, sort, descending, include
+        ):
+            record = json.loads(summary)
+            record.update({name: json.loads(data) for name, data in blobs.items()})
+            records[experiment_id] = record
+        return records
+
+    def list_json(
+        self,
+        forget_class,
+        method=None,
+        sort=None,
+        descending=False,
+        include=(),
+        encoding=None
+    ):
+        """
+        list() serialized as a JSON object. The stored JSON text is spliced
+        together instead of being decoded and encoded again; only points and
+        attack blobs not already in `encoding` ('rows' or 'columnar') are
+        converted.
+        """
+        parts = []
+        for experiment_id, summary, blobs in self._select(
+            forget_class, method, sort, descending, include
+        ):
+            fields = [summary[1:-1]] if summary != '{}' else []
+            fields.extend(
+                f'{json.dumps(name)}:{_encoded_blob(name, data, encoding)}'
+                for name, data in blobs.items()
+            )
+            parts.append(f'{json.dumps(experiment_id)}:{{{",".join(fields)}}}')
+        return f'{{{",".join(parts)}}}'
+
+    def get(self, forget_class, experiment_id, include=BLOB_FIELDS):
+        """Record of one experiment with the requested large fields, or None."""
+        forget_class = int(forget_class)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT summary FROM experiments WHERE forget_class = ? AND id = ?',
+                (forget_class, experiment_id)
+            ).fetchone()
+        if row is None:
+            return None
+        record = json.loads(row[0])
+        blobs = self._blob_texts(forget_class, {experiment_id}, include).get(experiment_id, {})
+        record.update({name: json.loads(data) for name, data in blobs.items()})
+        return record
+
+
+def get_results_store():
+    """Return the process-wide results store, opening it on first use."""
+    global _results_store
+    if _results_store is None:
+        with _results_store_lock:
+            if _results_store is None:
+                _results_store = ResultsStore()
+    return _results_store
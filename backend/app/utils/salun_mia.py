@@ -3,6 +3,7 @@ import torch
 import torch.nn.functional as F
 from sklearn.svm import SVC
 from typing import Tuple, Dict
+from app.config import MIA_CLASSIFIER_BACKEND
 
 
 def entropy(p, dim=-1, keepdim=False):
@@ -12,6 +13,73 @@ def entropy(p, dim=-1, keepdim=False):
 
 
 
+class ThresholdClassifier:
+    """
+    Exact minimum-error threshold classifier for one-dimensional features.
+
+    Every cut between two distinct sorted feature values, in both directions
+    ("member if above" and "member if below"), is scored with cumulative
+    label counts, and the cut with the fewest training errors is kept.
+    Drop-in replacement for SVC(kernel="linear") on 1-D MIA features.
+    """
+
+    def fit(self, X, y):
+        x = np.asarray(X, dtype=np.float64).reshape(len(X), -1)
+        if x.shape[1] != 1:
+            raise ValueError(f"ThresholdClassifier expects one feature, got {x.shape[1]}")
+        x = x[:, 0]
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        if len(self.classes_) != 2:
+            raise ValueError(f"ThresholdClassifier expects two classes, got {len(self.classes_)}")
+
+        order = np.argsort(x, kind='stable')
+        x_sorted = x[order]
+        is_positive = (y[order] == self.classes_[1])
+
+        # Cut k predicts the first k sorted samples as one class, the rest as the other
+        pos_below = np.concatenate([[0], np.cumsum(is_positive)])
+        neg_below = np.arange(len(x) + 1) - pos_below
+        n_pos, n_neg = pos_below[-1], neg_below[-1]
+        errors_above = pos_below + (n_neg - neg_below)  # positive if x >= threshold
+        errors_below = neg_below + (n_pos - pos_below)  # positive if x < threshold
+
+        # Only cuts between distinct values are realizable
+        valid = np.ones(len(x) + 1, dtype=bool)
+        valid[1:-1] = x_sorted[1:] > x_sorted[:-1]
+        errors_above = np.where(valid, errors_above, np.iinfo(np.int64).max)
+        errors_below = np.where(valid, errors_below, np.iinfo(np.int64).max)
+
+        k_above = int(np.argmin(errors_above))
+        k_below = int(np.argmin(errors_below))
+        self.positive_above_ = bool(errors_above[k_above] <= errors_below[k_below])
+        k = k_above if self.positive_above_ else k_below
+
+        if k == 0:
+            self.threshold_ = -np.inf
+        elif k == len(x):
+            self.threshold_ = np.inf
+        else:
+            self.threshold_ = (x_sorted[k - 1] + x_sorted[k]) / 2
+        return self
+
+    def predict(self, X):
+        x = np.asarray(X, dtype=np.float64).reshape(len(X), -1)[:, 0]
+        is_positive = x >= self.threshold_
+        if not self.positive_above_:
+            is_positive = ~is_positive
+        return np.where(is_positive, self.classes_[1], self.classes_[0])
+
+
+def make_mia_classifier(backend=MIA_CLASSIFIER_BACKEND):
+    """MIA classifier of the configured backend ('threshold' or 'svc')."""
+    if backend == 'svc':
+        return SVC(C=3, kernel="linear")
+    if backend == 'threshold':
+        return ThresholdClassifier()
+    raise ValueError(f"Unknown MIA classifier backend: {backend}")
+
+
 def collect_prob(data_loader, model, device, target_class=None):
     """Collect probability predictions from model."""
     from app.utils.evaluation import model_eval_mode
@@ -62,8 +130,8 @@ def SVC_fit_predict(shadow_train, shadow_test, target_train, target_test):
     
     Y_shadow = np.concatenate([np.ones(n_shadow_train), np.zeros(n_shadow_test)])
 
-    # Train SVM classifier (linear kernel for speed)
-    clf = SVC(C=3, kernel="linear")
+    # Train the 1-D membership classifier
+    clf = make_mia_classifier()
     clf.fit(X_shadow, Y_shadow)
 
     accs = []
@@ -169,19 +237,16 @@ async def calculate_salun_mia_efficacy(
     return results
 
 
-async def train_mia_classifier_once(
+async def collect_shadow_features(
     baseline_model,
     shadow_train_loader,
     shadow_test_loader,
-    device,
-    forget_class: int
+    device
 ) -> Dict:
     """
-    Train MIA classifier once with baseline model (epoch 0).
-    Returns trained classifiers for different features.
+    Confidence and entropy MIA features of the shadow train and test sets.
+    Returns None if either set is empty.
     """
-    print("Training MIA classifier with baseline model...")
-    
     # Collect probabilities from baseline model
     shadow_train_prob, shadow_train_labels = collect_prob(shadow_train_loader, baseline_model, device)
     shadow_test_prob, shadow_test_labels = collect_prob(shadow_test_loader, baseline_model, device)
@@ -195,39 +260,39 @@ async def train_mia_classifier_once(
     print(f"Shadow test samples: {shadow_test_prob.shape[0]}")
     
     if shadow_train_prob.shape[0] == 0 or shadow_test_prob.shape[0] == 0:
-        print("Warning: Insufficient shadow data for MIA training")
         return None
     
     # Extract features for MIA training (confidence and entropy only)
-    shadow_train_conf = torch.gather(shadow_train_prob, 1, shadow_train_labels[:, None])
-    shadow_test_conf = torch.gather(shadow_test_prob, 1, shadow_test_labels[:, None])
-    
-    shadow_train_entr = entropy(shadow_train_prob).unsqueeze(1)
-    shadow_test_entr = entropy(shadow_test_prob).unsqueeze(1)
-    
+    return {
+        'train_confidence': torch.gather(shadow_train_prob, 1, shadow_train_labels[:, None]).cpu().numpy(),
+        'test_confidence': torch.gather(shadow_test_prob, 1, shadow_test_labels[:, None]).cpu().numpy(),
+        'train_entropy': entropy(shadow_train_prob).unsqueeze(1).cpu().numpy(),
+        'test_entropy': entropy(shadow_test_prob).unsqueeze(1).cpu().numpy()
+    }
+
+
+def fit_mia_classifiers(shadow_features: Dict) -> Dict:
+    """Fit one membership classifier per feature on collected shadow features."""
     # Train classifiers for each feature (excluding prob for stability)
     classifiers = {}
     
     try:
-        # Train separate classifier for each feature
-        features = {
-            'confidence': (shadow_train_conf, shadow_test_conf), 
-            'entropy': (shadow_train_entr, shadow_test_entr)
-        }
-        
-        for feat_name, (train_feat, test_feat) in features.items():
+        for feat_name in ('confidence', 'entropy'):
+            train_feat = shadow_features[f'train_{feat_name}']
+            test_feat = shadow_features[f'test_{feat_name}']
+            
             # Prepare training data
             n_train = train_feat.shape[0]
             n_test = test_feat.shape[0]
             
-            X = torch.cat([train_feat, test_feat]).cpu().numpy()
+            X = np.concatenate([train_feat, test_feat])
             if len(X.shape) > 2:
                 X = X.reshape(n_train + n_test, -1)
             
             y = np.concatenate([np.ones(n_train), np.zeros(n_test)])
             
             # Train classifier
-            clf = SVC(C=3, kernel="linear")
+            clf = make_mia_classifier()
             clf.fit(X, y)
             classifiers[feat_name] = clf
             
@@ -239,6 +304,29 @@ async def train_mia_classifier_once(
         return None
 
 
+async def train_mia_classifier_once(
+    baseline_model,
+    shadow_train_loader,
+    shadow_test_loader,
+    device,
+    forget_class: int
+) -> Dict:
+    """
+    Train MIA classifier once with baseline model (epoch 0).
+    Returns trained classifiers for different features.
+    """
+    print("Training MIA classifier with baseline model...")
+    
+    shadow_features = await collect_shadow_features(
+        baseline_model, shadow_train_loader, shadow_test_loader, device
+    )
+    if shadow_features is None:
+        print("Warning: Insufficient shadow data for MIA training")
+        return None
+    
+    return fit_mia_classifiers(shadow_features)
+
+
 async def predict_mia_efficacy(
     current_model,
     mia_classifier,
@@ -260,6 +348,17 @@ async def predict_mia_efficacy(
     if forget_prob.shape[0] == 0:
         return {'C-MIA': 0.5, 'E-MIA': 0.5}
     
+    return predict_mia_efficacy_from_probs(mia_classifier, forget_prob, forget_labels)
+
+
+def predict_mia_efficacy_from_probs(mia_classifier, forget_prob, forget_labels):
+    """
+    predict_mia_efficacy on already collected forget set probabilities, so
+    callers holding the current model's logits skip another forward pass.
+    """
+    if mia_classifier is None or forget_prob.shape[0] == 0:
+        return {'C-MIA': 0.5, 'E-MIA': 0.5}
+    
     # Debug: Check forget data
     forget_classes = torch.unique(forget_labels)
     print(f"Forget classes: {forget_classes.tolist()}")
@@ -0,0 +1,173 @@
+"""
+Streaming minibatch CKA (Nguyen et al., 2020) between one candidate model
+and any number of reference models.
+
+Unbiased HSIC statistics are accumulated batch by batch, so memory is bounded
+by one batch of Gram matrices regardless of the subset size. The candidate is
+forwarded once per batch and compared against every reference; references
+are either live models (forwarded on the same batch) or precomputed per-batch
+Gram stacks, which are read one layer at a time. HSIC terms are reduced in
+float64 because the unbiased estimator subtracts large, nearly equal sums.
+"""
+import torch
+
+# The unbiased estimator divides by n - 3
+MIN_BATCH_SIZE = 4
+
+
+def _hsic_dtype(device):
+    # The unbiased estimator cancels large terms; MPS has no float64 support
+    return torch.float32 if device.type == 'mps' else torch.float64
+
+
+def layer_grams(model, inputs, layers):
+    """
+    Forward one batch and return the linear-kernel Gram matrix of every
+    hooked layer, stacked as (len(layers), n, n).
+    """
+    modules = dict(model.named_modules())
+    features = {}
+
+    def make_hook(name):
+        def hook(module, input, output):
+            feat = output.detach()
+            features[name] = feat.flatten(1) if feat.dim() > 2 else feat
+        return hook
+
+    handles = [modules[name].register_forward_hook(make_hook(name)) for name in layers]
+    try:
+        with torch.inference_mode():
+            model(inputs)
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    return torch.stack([torch.mm(features[name], features[name].T) for name in layers])
+
+
+class GramStatistics:
+    """Intermediates of the unbiased HSIC estimator for a (L, n, n) Gram stack."""
+
+    def __init__(self, grams):
+        n = grams.size(-1)
+        if n < MIN_BATCH_SIZE:
+            raise ValueError(f"Unbiased HSIC requires a batch size > 3, got {n}")
+        grams = grams.to(_hsic_dtype(grams.device))
+        self.grams = grams
+        self.n = n
+        self.diag = torch.diagonal(grams, dim1=-2, dim2=-1)
+        self.total = grams.sum(dim=(-2, -1)) - self.diag.sum(dim=-1)
+        self.col_sum = grams.sum(dim=-2) - self.diag
+
+    def self_hsic(self):
+        """Unbiased HSIC(K, K) of every layer, shape (L,)."""
+        n = self.n
+        trace = (self.grams * self.grams).sum(dim=(-2, -1)) - (self.diag * self.diag).sum(dim=-1)
+        term2 = self.total * self.total / ((n - 1) * (n - 2))
+        term3 = 2 / (n - 2) * (self.col_sum * self.col_sum).sum(dim=-1)
+        return (trace + term2 - term3) / (n * (n - 3))
+
+    def cross_hsic(self, other):
+        """Unbiased HSIC between every layer pair, shape (L_self, L_other)."""
+        n = self.n
+        trace = torch.einsum("aij,bij->ab", self.grams, other.grams) - self.diag @ other.diag.T
+        term2 = torch.outer(self.total, other.total) / ((n - 1) * (n - 2))
+        term3 = 2 / (n - 2) * (self.col_sum @ other.col_sum.T)
+        return (trace + term2 - term3) / (n * (n - 3))
+
+
+class StreamingCKA:
+    """
+    Accumulated HSIC statistics of one loader: candidate self-HSIC plus, for
+    every reference, its self-HSIC and the reference x candidate cross-HSIC.
+    """
+
+    def __init__(self, reference_names, num_layers, device):
+        dtype = _hsic_dtype(torch.device(device))
+        self.hsic_candidate = torch.zeros(num_layers, dtype=dtype, device=device)
+        self.hsic_reference = {
+            name: torch.zeros(num_layers, dtype=dtype, device=device) for name in reference_names
+        }
+        self.hsic_cross = {
+            name: torch.zeros(num_layers, num_layers, dtype=dtype, device=device)
+            for name in reference_names
+        }
+
+    def update(self, candidate_grams, reference_grams):
+        """
+        Add one batch. Batches smaller than MIN_BATCH_SIZE (such as the
+        last batch of a subset) are skipped, as unbiased HSIC is undefined
+        for them.
+
+        Args:
+            candidate_grams: (L, n, n) Gram stack of the candidate model
+            reference_grams: Mapping of reference name to its (L, n, n) Gram
+                stack for the same batch; stacks may live on CPU or be
+                memory-mapped and are moved to the device one layer at a time
+        """
+        if candidate_grams.size(-1) < MIN_BATCH_SIZE:
+            return
+        candidate = GramStatistics(candidate_grams)
+        self.hsic_candidate += candidate.self_hsic()
+        device = candidate_grams.device
+
+        for name, grams in reference_grams.items():
+            for layer in range(grams.size(0)):
+                reference = GramStatistics(grams[layer:layer + 1].to(device))
+                self.hsic_reference[name][layer] += reference.self_hsic()[0]
+                self.hsic_cross[name][layer] += reference.cross_hsic(candidate)[0]
+
+    def compute(self):
+        """CKA matrix (reference layers x candidate layers) of every reference."""
+        results = {}
+        for name in self.hsic_cross:
+            denominator = torch.sqrt(torch.clamp(
+                self.hsic_reference[name].unsqueeze(1) * self.hsic_candidate.unsqueeze(0), min=0.0
+            ))
+            denominator = torch.where(denominator == 0, 1e-6, denominator)
+            results[name] = torch.clamp(
+                self.hsic_cross[name] / denominator, min=0.0, max=1.0
+            ).float().cpu()
+        return results
+
+
+def compute_cka(candidate, references, loaders, layers, device):
+    """
+    CKA between `candidate` and every reference over each loader, with a
+    single forward pass of the candidate per batch.
+
+    Args:
+        candidate: Model under evaluation
+        references: Mapping of name to either a live reference model or a
+            list (one entry per loader) of per-batch (L, n, n) Gram stacks
+        loaders: Unshuffled loaders shared by candidate and references
+        layers: Names of the hooked layers
+        device: Device to run the computation on
+
+    Returns:
+        Mapping of reference name to a list of (L, L) CKA matrices, one per
+        loader, indexed [reference layer, candidate layer]
+    """
+    results = {name: [] for name in references}
+
+    for loader_idx, loader in enumerate(loaders):
+        accumulator = StreamingCKA(references.keys(), len(layers), device)
+        for batch_idx, (inputs, _) in enumerate(loader):
+            if inputs.size(0) < MIN_BATCH_SIZE:
+                # Skipped by the accumulator, so not worth forwarding
+                continue
+            inputs = inputs.to(device)
+            candidate_grams = layer_grams(candidate, inputs, layers)
+
+            reference_grams = {}
+            for name, reference in references.items():
+                if isinstance(reference, torch.nn.Module):
+                    reference_grams[name] = layer_grams(reference, inputs, layers)
+                else:
+                    reference_grams[name] = reference[loader_idx][batch_idx]
+            accumulator.update(candidate_grams, reference_grams)
+
+        for name, matrix in accumulator.compute().items():
+            results[name].append(matrix)
+
+    return results
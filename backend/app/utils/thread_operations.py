@@ -1,10 +1,13 @@
 """
 Utility functions for thread operations to reduce code duplication in _thread files.
 """
+import numpy as np
 import torch
 import time
-from torch.utils.data import DataLoader, Subset
-from app.config import UMAP_DATA_SIZE, UMAP_DATASET, UNLEARN_SEED
+from torch.utils.data import Subset
+from app.config import UMAP_DATA_SIZE, UMAP_DATASET, UNLEARN_SEED, PLOT_EPOCH_METRICS
+from app.utils.class_index import get_class_index
+from app.utils.data_loader import create_data_loader
 
 
 def setup_umap_subset(
@@ -24,21 +27,12 @@ def setup_umap_subset(
         Tuple of (umap_subset, umap_subset_loader, selected_indices)
     """
     dataset = train_set if UMAP_DATASET == 'train' else test_set
-    targets = torch.tensor(dataset.targets)
-    class_indices = [(targets == i).nonzero().squeeze() for i in range(num_classes)]
-    
-    samples_per_class = UMAP_DATA_SIZE // num_classes
-    generator = torch.Generator()
-    generator.manual_seed(UNLEARN_SEED)
-    selected_indices = []
-    
-    for indices in class_indices:
-        perm = torch.randperm(len(indices), generator=generator)
-        selected_indices.extend(indices[perm[:samples_per_class]].tolist())
+    class_index = get_class_index(train=(UMAP_DATASET == 'train'))
+    selected_indices = class_index.balanced_subset(UMAP_DATA_SIZE, UNLEARN_SEED)
     
     umap_subset = Subset(dataset, selected_indices)
-    umap_subset_loader = DataLoader(
-        umap_subset, batch_size=UMAP_DATA_SIZE, shuffle=False
+    umap_subset_loader = create_data_loader(
+        umap_subset, batch_size=UMAP_DATA_SIZE, shuffle=False, num_workers=0
     )
     
     return umap_subset, umap_subset_loader, selected_indices
@@ -125,26 +119,21 @@ def prepare_detailed_results(
         forget_class: Class to forget
     
     Returns:
-        List of detailed results in standard format
+        Columnar points (see app.utils.columnar); decode_points gives the
+        [gt, pred, img, forget, x, y, {class: prob}] rows
     """
-    from app.utils.helpers import compress_prob_array
-    
-    detailed_results = []
-    for i in range(len(umap_subset)):
-        original_index = selected_indices[i]
-        ground_truth = umap_subset.dataset.targets[original_index]
-        is_forget = (ground_truth == forget_class)
-        detailed_results.append([
-            int(ground_truth),                             # gt
-            int(predicted_labels[i]),                      # pred
-            int(original_index),                           # img
-            1 if is_forget else 0,                         # forget as binary
-            round(float(umap_embedding[i][0]), 2),         # x coordinate
-            round(float(umap_embedding[i][1]), 2),         # y coordinate
-            compress_prob_array(probs[i].tolist()),        # compressed probabilities
-        ])
-    
-    return detailed_results
+    from app.utils.columnar import encode_points
+    
+    selected_indices = np.asarray(selected_indices, dtype=np.int64)[:len(umap_subset)]
+    ground_truth = np.asarray(umap_subset.dataset.targets)[selected_indices]
+    return encode_points(
+        ground_truth,
+        np.asarray(predicted_labels)[:len(selected_indices)],
+        selected_indices,
+        forget_class,
+        np.asarray(umap_embedding)[:len(selected_indices)],
+        np.asarray(probs)[:len(selected_indices)]
+    )
 
 
 def create_base_results_dict(
@@ -203,7 +192,8 @@ def save_results_and_model(
     status
 ):
     """
-    Save results to JSON and model weights with consistent file structure.
+    Save results to JSON (indexed in the results store) and model weights
+    with consistent file structure.
     
     Args:
         results: Results dictionary to save
@@ -228,6 +218,13 @@ def save_results_and_model(
     with open(result_path, 'w') as f:
         json.dump(results, f, indent=2)
     
+    # Index the results for listing (the JSON file stays the source of truth)
+    try:
+        from app.utils.results_store import get_results_store
+        get_results_store().put(forget_class, results, result_path)
+    except Exception as e:
+        print(f"Error indexing results: {e}")
+    
     # Save model
     save_model(
         model=model,
@@ -331,14 +328,19 @@ async def calculate_comprehensive_epoch_metrics(
     """
     Calculate comprehensive epoch metrics (UA, RA, TUA, TRA, PS, C-MIA, E-MIA) if enabled.
     All-or-nothing approach: either calculate everything or nothing.
+    The train and test splits are forwarded once each (without augmentation)
+    and every metric is derived from those logits. With
+    EPOCH_METRICS_SUBSAMPLE_SIZE set, a seeded class-stratified subsample of
+    each split is used instead and UA, RA, TUA, TRA and PS are reported with
+    bootstrap intervals ("<metric>_CI_low" / "<metric>_CI_high").
     
     Args:
         model: Model to evaluate
-        train_loader: Training data loader
-        test_loader: Test data loader
+        train_loader: Training data loader (unused; train_set is evaluated)
+        test_loader: Test data loader (unused; test_set is evaluated)
         train_set: Training dataset
         test_set: Test dataset
-        criterion: Loss criterion
+        criterion: Loss criterion (unused; no loss is reported)
         device: Device to use
         forget_class: Class to forget
         enable_metrics: Whether to calculate metrics (all or nothing)
@@ -352,74 +354,113 @@ async def calculate_comprehensive_epoch_metrics(
         return None
         
     try:
-        from app.utils.evaluation import evaluate_model
-        
-        # Evaluate on full train and test sets
-        train_loss, _, train_class_accuracies = await evaluate_model(
-            model, train_loader, criterion, device
-        )
-        test_loss, _, test_class_accuracies = await evaluate_model(
-            model, test_loader, criterion, device
+        from app.utils.augmentation import AugmentedView
+        from app.utils.fused_evaluation import capture_split
+        from app.utils.forget_evaluation import attack_features
+        from app.utils.metrics import MetricsAccumulator
+        from app.utils.epoch_subsample import (
+            epoch_subsample_indices, accuracy_intervals, privacy_score_interval
         )
+        import torch.nn.functional as F
+        
+        # One forward pass per split (or per split subsample); every metric
+        # below is derived from it
+        clean_train_set = train_set.dataset if isinstance(train_set, AugmentedView) else train_set
+        clean_test_set = test_set.dataset if isinstance(test_set, AugmentedView) else test_set
+        train_subsample = epoch_subsample_indices(train=True)
+        test_subsample = epoch_subsample_indices(train=False)
+        subsampled = train_subsample is not None or test_subsample is not None
+        if train_subsample is not None:
+            clean_train_set = Subset(clean_train_set, train_subsample.tolist())
+        if test_subsample is not None:
+            clean_test_set = Subset(clean_test_set, test_subsample.tolist())
+        train_capture = await capture_split(model, clean_train_set, device)
+        test_capture = await capture_split(model, clean_test_set, device)
+        
+        split_results = []
+        for capture in (train_capture, test_capture):
+            accumulator = MetricsAccumulator()
+            accumulator.update(capture.logits, capture.labels)
+            split_results.append(accumulator.compute())
+        train_results, test_results = split_results
         
         # Calculate basic accuracy metrics
         accuracy_metrics = calculate_accuracy_metrics(
-            train_class_accuracies, test_class_accuracies, forget_class
+            train_results["class_accuracies"], test_results["class_accuracies"], forget_class
         )
         
         result_metrics = accuracy_metrics.copy()
+        if subsampled:
+            result_metrics.update(accuracy_intervals(train_results, test_results, forget_class))
+        
+        # Forget class rows of the train capture and their dataset indices
+        forget_rows = torch.nonzero(train_capture.labels == forget_class).flatten()
+        forget_indices = (
+            forget_rows.tolist() if train_subsample is None
+            else train_subsample[forget_rows.numpy()].tolist()
+        )
+        forget_logits = train_capture.logits[forget_rows]
         
         # Calculate Privacy Score
         try:
             # If epoch is 0, set PS to 0 (initial state before training)
             if current_epoch is not None and current_epoch == 0:
                 ps_score = 0.0
+                ps_interval = {'PS_CI_low': 0.0, 'PS_CI_high': 0.0}
                 print(f"Setting PS to 0.0 for epoch {current_epoch} (initial state)")
             else:
-                from app.utils.attack_optimized_ps import calculate_ps_with_cached_retrain
-                from app.utils.attack import process_attack_metrics
+                from app.utils.attack_optimized_ps import calculate_ps_from_metrics
+                from app.utils.attack import score_attack_values
                 
                 if retrain_metrics_cache is not None:
-                    # Use optimized PS calculation with cached retrain metrics
-                    ps_score = await calculate_ps_with_cached_retrain(
-                        unlearn_model=model,
-                        data_loader=train_loader,
-                        device=device,
-                        forget_class=forget_class,
-                        retrain_metrics_cache=retrain_metrics_cache
-                    )
+                    # Score the forget class against the cached retrain metrics
+                    entropies, confidences = attack_features(forget_logits)
+                    
+                    def score_fn(entropies, confidences):
+                        return calculate_ps_from_metrics(
+                            {"entropies": list(entropies), "confidences": list(confidences)},
+                            retrain_metrics_cache
+                        )
+                elif subsampled:
+                    # Fallback to the forget class samples of the subsample
+                    entropies, confidences = attack_features(forget_logits)
+                    indices = forget_indices
+                    
+                    def score_fn(entropies, confidences):
+                        return score_attack_values(indices, entropies, confidences, forget_class)[2]
                 else:
-                    # Fallback to subset calculation for speed
-                    umap_subset, umap_subset_loader, _ = setup_umap_subset(train_set, test_set, 10)
-                    _, _, ps_score = await process_attack_metrics(
-                        model=model,
-                        data_loader=umap_subset_loader,
-                        device=device,
-                        forget_class=forget_class
-                    )
+                    # Fallback to the forget class samples of the UMAP subset
+                    _, _, umap_indices = setup_umap_subset(train_set, test_set, 10)
+                    umap_capture = train_capture if UMAP_DATASET == 'train' else test_capture
+                    umap_rows = torch.as_tensor(umap_indices, dtype=torch.long)
+                    umap_rows = umap_rows[umap_capture.labels[umap_rows] == forget_class]
+                    entropies, confidences = attack_features(umap_capture.logits[umap_rows])
+                    indices = umap_rows.tolist()
+                    
+                    def score_fn(entropies, confidences):
+                        return score_attack_values(indices, entropies, confidences, forget_class)[2]
+                
+                ps_score = score_fn(entropies, confidences)
+                if subsampled:
+                    ps_interval = privacy_score_interval(entropies, confidences, score_fn)
             result_metrics['PS'] = ps_score
+            if subsampled:
+                result_metrics.update(ps_interval)
         except Exception as e:
             print(f"Error calculating PS: {e}")
             result_metrics['PS'] = 0.5
+            if subsampled:
+                result_metrics.update({'PS_CI_low': 0.5, 'PS_CI_high': 0.5})
         
         # Calculate MIA-Efficacy
         try:
             if mia_classifier is not None:
-                from app.utils.salun_mia import predict_mia_efficacy
-                from torch.utils.data import DataLoader, Subset
+                from app.utils.salun_mia import predict_mia_efficacy_from_probs
                 
-                # Create forget loader for MIA calculation
-                forget_indices = [i for i, target in enumerate(train_set.targets) 
-                                if target == forget_class]
-                forget_subset = Subset(train_set, forget_indices)
-                forget_loader = DataLoader(forget_subset, batch_size=128, shuffle=False)
-                
-                mia_results = await predict_mia_efficacy(
-                    current_model=model,
-                    mia_classifier=mia_classifier,
-                    forget_loader=forget_loader,
-                    device=device,
-                    forget_class=forget_class
+                mia_results = predict_mia_efficacy_from_probs(
+                    mia_classifier,
+                    F.softmax(forget_logits, dim=-1),
+                    train_capture.labels[forget_rows]
                 )
                 result_metrics['C-MIA'] = mia_results['C-MIA']
                 result_metrics['E-MIA'] = mia_results['E-MIA']
@@ -452,11 +493,13 @@ async def initialize_epoch_metrics_system(
 ):
     """
     Initialize components needed for comprehensive epoch metrics calculation.
+    Retrain metrics and MIA shadow features are persisted per forget class and
+    checkpoint hash, so repeated jobs only refit the MIA classifiers.
     
     Args:
         model: Initial model for MIA classifier training
-        train_set: Training dataset
-        test_set: Test dataset
+        train_set: Training dataset (unused; shadow sets use the clean store views)
+        test_set: Test dataset (unused; shadow sets use the clean store views)
         train_loader: Training data loader
         device: Device to use
         forget_class: Class to forget
@@ -475,68 +518,94 @@ async def initialize_epoch_metrics_system(
     # Initialize retrain cache for PS if enabled
     if enable_ps:
         try:
-            from app.utils.attack_full_dataset import calculate_model_metrics
+            from app.utils.fused_evaluation import forget_class_metrics
+            from app.utils.attack_full_dataset import _create_distribution_plots
+            from app.utils.epoch_metrics_cache import load_retrain_metrics, save_retrain_metrics
+            from app.utils.logits_cache import state_dict_hash
             from app.models import get_resnet18
             import os
             
             retrain_model_path = f"unlearned_models/{forget_class}/a00{forget_class}.pth"
             if os.path.exists(retrain_model_path):
-                print("Pre-calculating retrain metrics for PS optimization...")
-                retrain_model = get_resnet18().to(device)
-                retrain_model.load_state_dict(torch.load(retrain_model_path, map_location=device))
-                retrain_model.eval()
+                retrain_state = torch.load(retrain_model_path, map_location='cpu')
+                retrain_hash = state_dict_hash(retrain_state)
+                retrain_metrics = load_retrain_metrics(forget_class, retrain_hash)
                 
-                components['retrain_metrics_cache'] = await calculate_model_metrics(
-                    retrain_model, train_loader, device, forget_class, 2.0, 1.0,
-                    create_plots=True, model_name="Retrain"
-                )
-                print(f"Retrain metrics cached: {len(components['retrain_metrics_cache']['entropies'])} samples")
+                if retrain_metrics is not None:
+                    print("Loaded cached retrain metrics for PS optimization")
+                    if retrain_metrics['entropies']:
+                        _create_distribution_plots(
+                            retrain_metrics['entropies'], retrain_metrics['confidences'],
+                            "Retrain", forget_class, 2.0, 1.0
+                        )
+                else:
+                    print("Pre-calculating retrain metrics for PS optimization...")
+                    retrain_model = get_resnet18().to(device)
+                    retrain_model.load_state_dict(retrain_state)
+                    retrain_model.eval()
+                    
+                    retrain_metrics = await forget_class_metrics(
+                        retrain_model, device, forget_class, 2.0, 1.0,
+                        create_plots=True, model_name="Retrain"
+                    )
+                    save_retrain_metrics(forget_class, retrain_hash, retrain_metrics)
+                    
+                    # Free memory
+                    del retrain_model
+                    if device.type == 'cuda':
+                        torch.cuda.empty_cache()
                 
-                # Free memory
-                del retrain_model
-                if device.type == 'cuda':
-                    torch.cuda.empty_cache()
+                components['retrain_metrics_cache'] = retrain_metrics
+                print(f"Retrain metrics cached: {len(retrain_metrics['entropies'])} samples")
         except Exception as e:
             print(f"Error pre-calculating retrain metrics: {e}")
     
     # Initialize MIA classifier if enabled
     if enable_mia:
         try:
-            from app.utils.salun_mia import train_mia_classifier_once
-            from torch.utils.data import DataLoader, Subset
-            import random
+            from app.utils.salun_mia import collect_shadow_features, fit_mia_classifiers
+            from app.utils.epoch_metrics_cache import (
+                shadow_indices, load_shadow_features, save_shadow_features
+            )
+            from app.utils.logits_cache import state_dict_hash
+            from app.utils.dataset_store import get_dataset_store
             
             print("Initializing MIA classifier...")
             
-            # Create shadow loaders
-            remaining_train_indices = [i for i, target in enumerate(train_set.targets) 
-                                      if target != forget_class]
-            shadow_train_size = min(4500, len(remaining_train_indices))
-            shadow_train_indices = random.sample(remaining_train_indices, shadow_train_size)
-            shadow_train_subset = Subset(train_set, shadow_train_indices)
-            shadow_train_loader = DataLoader(shadow_train_subset, batch_size=128, shuffle=False)
-            
-            remaining_test_indices = [i for i, target in enumerate(test_set.targets) 
-                                     if target != forget_class]
-            shadow_test_size = min(4500, len(remaining_test_indices))
-            shadow_test_indices = random.sample(remaining_test_indices, shadow_test_size)
-            shadow_test_subset = Subset(test_set, shadow_test_indices)
-            shadow_test_loader = DataLoader(shadow_test_subset, batch_size=128, shuffle=False)
+            # Seeded shadow sets outside the forget class, drawn from the
+            # un-augmented store views so the cached features are reproducible
+            store = get_dataset_store()
+            shadow_train_indices = shadow_indices(get_class_index(), forget_class)
+            shadow_test_indices = shadow_indices(get_class_index(train=False), forget_class)
+            shadow_train_subset = Subset(store.train_view(), shadow_train_indices.tolist())
+            shadow_train_loader = create_data_loader(shadow_train_subset, batch_size=128, shuffle=False, num_workers=0)
+            shadow_test_subset = Subset(store.test_view(), shadow_test_indices.tolist())
+            shadow_test_loader = create_data_loader(shadow_test_subset, batch_size=128, shuffle=False, num_workers=0)
             
             components['shadow_loaders'] = {
                 'shadow_train': shadow_train_loader,
                 'shadow_test': shadow_test_loader
             }
             
-            # Train MIA classifier
-            components['mia_classifier'] = await train_mia_classifier_once(
-                baseline_model=model,
-                shadow_train_loader=shadow_train_loader,
-                shadow_test_loader=shadow_test_loader,
-                device=device,
-                forget_class=forget_class
-            )
-            print("MIA classifier training completed!")
+            baseline_hash = state_dict_hash(model)
+            shadow_features = load_shadow_features(forget_class, baseline_hash)
+            if shadow_features is not None:
+                print("Loaded cached MIA shadow features")
+            else:
+                print("Training MIA classifier with baseline model...")
+                shadow_features = await collect_shadow_features(
+                    model, shadow_train_loader, shadow_test_loader, device
+                )
+                if shadow_features is not None:
+                    shadow_features['train_indices'] = shadow_train_indices
+                    shadow_features['test_indices'] = shadow_test_indices
+                    save_shadow_features(forget_class, baseline_hash, shadow_features)
+            
+            if shadow_features is None:
+                print("Warning: Insufficient shadow data for MIA training")
+            else:
+                components['mia_classifier'] = fit_mia_classifiers(shadow_features)
+                print("MIA classifier training completed!")
             
         except Exception as e:
             print(f"Error initializing MIA classifier: {e}")
@@ -561,6 +630,9 @@ def update_epoch_metrics_collection(
     for key, value in metrics.items():
         if key in epoch_metrics:
             epoch_metrics[key].append(value)
+        elif key.endswith(('_CI_low', '_CI_high')) and epoch_metrics:
+            # Bootstrap intervals of subsampled epoch metrics
+            epoch_metrics.setdefault(key, []).append(value)
 
 
 def save_epoch_plots(
@@ -579,19 +651,24 @@ def save_epoch_plots(
         experiment_id: Experiment ID
         
     Returns:
-        Path to saved plot or None if no metrics
+        Path the plot is rendered to (by the plot service), or None if no
+        metrics or epoch plots are disabled
     """
-    if not epoch_metrics or not any(epoch_metrics.values()):
+    if not PLOT_EPOCH_METRICS or not epoch_metrics or not any(epoch_metrics.values()):
         return None
         
     try:
-        from app.utils.epoch_plotting import plot_epoch_metrics
+        from app.utils.epoch_plotting import plot_epoch_metrics, epoch_plot_path
+        from app.utils.plot_service import submit_plot
         
-        plot_path = plot_epoch_metrics(
-            epoch_metrics=epoch_metrics,
+        plot_path = epoch_plot_path(method, forget_class, experiment_id)
+        submit_plot(
+            plot_epoch_metrics,
+            epoch_metrics={key: list(values) for key, values in epoch_metrics.items()},
             method=method,
             forget_class=forget_class,
-            experiment_id=experiment_id
+            experiment_id=experiment_id,
+            filepath=plot_path
         )
         return plot_path
         
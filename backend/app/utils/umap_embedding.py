@@ -0,0 +1,282 @@
+"""
+UMAP embedding service.
+
+For every forget class a reducer is fitted once on the penultimate
+activations of the base model (unlearned_models/{fc}/000{fc}.pth) over the
+fixed UMAP subset. The fitted reducer, including its nearest-neighbor search
+index, is pickled under UMAP_REDUCER_DIR. Unlearned models are then embedded
+into that layout, so coordinates are comparable across experiments:
+
+    'transform'   reducer.transform(activations)
+    'warm_start'  a short fit initialized at the base embedding (rows align,
+                  because the UMAP subset is fixed)
+    'fit'         a fresh fit per job (previous behavior)
+
+With UMAP_PCA_COMPONENTS > 0 the 512-d activations are first projected onto
+a PCA basis fitted on the same base activations, which shortens UMAP's
+nearest-neighbor graph construction. The basis is cached next to the reducer.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import torch
+from sklearn.decomposition import PCA
+from umap import UMAP
+
+from app.config import (
+    UMAP_N_NEIGHBORS,
+    UMAP_MIN_DIST,
+    UMAP_INIT,
+    UMAP_N_JOBS,
+    UMAP_DATA_SIZE,
+    UMAP_DATASET,
+    UMAP_EMBEDDING_MODE,
+    UMAP_WARM_START_EPOCHS,
+    UMAP_REDUCER_DIR,
+    UMAP_PCA_COMPONENTS,
+    UNLEARN_SEED,
+    DATASET_VERSION,
+    GPU_ID
+)
+
+_reducers = {}
+_reducers_lock = threading.Lock()
+_projections = {}
+_projections_lock = threading.Lock()
+
+
+def _new_reducer(**kwargs):
+    params = {
+        'n_components': 2,
+        'n_neighbors': UMAP_N_NEIGHBORS,
+        'min_dist': UMAP_MIN_DIST,
+        'init': UMAP_INIT,
+        'n_jobs': UMAP_N_JOBS
+    }
+    params.update(kwargs)
+    return UMAP(**params)
+
+
+def _default_device():
+    return torch.device(
+        f"cuda:{GPU_ID}" if torch.cuda.is_available()
+        else "mps" if torch.backends.mps.is_available()
+        else "cpu"
+    )
+
+
+def base_model_path(forget_class):
+    return f"unlearned_models/{forget_class}/000{forget_class}.pth"
+
+
+def _base_digest(model_path, params=''):
+    """Hash of a base checkpoint's file identity, the UMAP subset and `params`."""
+    stat = os.stat(model_path)
+    digest = hashlib.sha1()
+    digest.update(f'{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    digest.update(f'{DATASET_VERSION}:{UMAP_DATASET}:{UMAP_DATA_SIZE}:{UNLEARN_SEED}:{params}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def _reducer_path(model_path, forget_class):
+    """Reducer file of a base checkpoint, keyed by its file identity and the UMAP setup."""
+    digest = _base_digest(
+        model_path,
+        f'{UMAP_N_NEIGHBORS}:{UMAP_MIN_DIST}:{UMAP_INIT}:{UMAP_PCA_COMPONENTS}'
+    )
+    return os.path.join(UMAP_REDUCER_DIR, str(forget_class), f'base_{digest}.pkl')
+
+
+def _projection_path(model_path, forget_class):
+    """PCA basis file of a base checkpoint."""
+    digest = _base_digest(model_path, f'pca:{UMAP_PCA_COMPONENTS}')
+    return os.path.join(UMAP_REDUCER_DIR, str(forget_class), f'pca_{digest}.npz')
+
+
+def _replace_cached(path, write, prefix):
+    """Atomically write `path`, dropping stale files with the same prefix."""
+    cache_dir = os.path.dirname(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and not name.endswith('.tmp'):
+            os.remove(os.path.join(cache_dir, name))
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def fit_projection(activations, n_components=UMAP_PCA_COMPONENTS):
+    """PCA basis of `activations` as {"mean", "components"}, or None when disabled."""
+    n_components = min(n_components, *np.shape(activations))
+    if n_components <= 0:
+        return None
+    pca = PCA(n_components=n_components, svd_solver='full')
+    pca.fit(np.asarray(activations, dtype=np.float32))
+    return {
+        'mean': pca.mean_.astype(np.float32),
+        'components': pca.components_.astype(np.float32)
+    }
+
+
+def project(activations, projection):
+    """Project activations onto a fit_projection basis (identity for None)."""
+    if projection is None:
+        return activations
+    centered = np.asarray(activations, dtype=np.float32) - projection['mean']
+    return centered @ projection['components'].T
+
+
+async def _base_activations(model_path, device):
+    """Avgpool activations of the base model on the UMAP subset, in subset order."""
+    from app.models import get_resnet18
+    from app.utils.class_index import get_class_index
+    from app.utils.dataset_store import get_dataset_store
+    from app.utils.fused_evaluation import capture_split
+
+    on_train = UMAP_DATASET == 'train'
+    umap_indices = get_class_index(train=on_train).balanced_subset(UMAP_DATA_SIZE, UNLEARN_SEED)
+    store = get_dataset_store()
+
+    model = get_resnet18().to(device)
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    capture = await capture_split(
+        model, store.train_view() if on_train else store.test_view(), device,
+        feature_indices=umap_indices, split=UMAP_DATASET
+    )
+    del model
+    if device.type == 'cuda':
+        torch.cuda.empty_cache()
+    return capture.features
+
+
+async def get_base_projection(forget_class, device=None, activations=None):
+    """
+    PCA basis fitted on the base model of `forget_class`, loaded from disk
+    or fitted and persisted on first use.
+
+    Args:
+        activations: Base model activations on the UMAP subset, if already
+            computed
+
+    Returns:
+        {"mean", "components"}, or None when disabled or without a base
+        checkpoint
+    """
+    model_path = base_model_path(forget_class)
+    if UMAP_PCA_COMPONENTS <= 0 or not os.path.exists(model_path):
+        return None
+    projection_path = _projection_path(model_path, forget_class)
+
+    entry = _projections.get(forget_class)
+    if entry is not None and entry[0] == projection_path:
+        return entry[1]
+
+    with _projections_lock:
+        entry = _projections.get(forget_class)
+        if entry is not None and entry[0] == projection_path:
+            return entry[1]
+
+        try:
+            with np.load(projection_path) as cached:
+                projection = {name: cached[name] for name in cached.files}
+        except (FileNotFoundError, OSError, ValueError):
+            print(f"Fitting PCA basis on base model {model_path}")
+            if activations is None:
+                activations = await _base_activations(model_path, device or _default_device())
+            projection = fit_projection(activations)
+            _replace_cached(projection_path, lambda f: np.savez(f, **projection), 'pca_')
+
+        _projections[forget_class] = (projection_path, projection)
+        return projection
+
+
+async def get_base_reducer(forget_class, device=None):
+    """
+    Reducer fitted on the base model of `forget_class`, loaded from disk or
+    fitted and persisted on first use.
+
+    Returns:
+        (reducer, base_embedding), or (None, None) without a base checkpoint
+    """
+    model_path = base_model_path(forget_class)
+    if not os.path.exists(model_path):
+        return None, None
+    reducer_path = _reducer_path(model_path, forget_class)
+
+    entry = _reducers.get(forget_class)
+    if entry is not None and entry[0] == reducer_path:
+        return entry[1], entry[2]
+
+    with _reducers_lock:
+        entry = _reducers.get(forget_class)
+        if entry is not None and entry[0] == reducer_path:
+            return entry[1], entry[2]
+
+        if os.path.exists(reducer_path):
+            print(f"Loading UMAP reducer from {reducer_path}")
+            with open(reducer_path, 'rb') as f:
+                reducer, base_embedding = pickle.load(f)
+        else:
+            print(f"Fitting UMAP reducer on base model {model_path}")
+            device = device or _default_device()
+            activations = await _base_activations(model_path, device)
+            projection = await get_base_projection(forget_class, device, activations)
+            reducer = _new_reducer()
+            base_embedding = reducer.fit_transform(project(activations, projection))
+            _replace_cached(
+                reducer_path, lambda f: pickle.dump((reducer, base_embedding), f), 'base_'
+            )
+
+        _reducers[forget_class] = (reducer_path, reducer, base_embedding)
+        return reducer, base_embedding
+
+
+async def embed_activations(activations, forget_class=-1, device=None, mode=UMAP_EMBEDDING_MODE):
+    """
+    2-D embedding of UMAP-subset activations in the layout of the forget
+    class's base model. Falls back to a fresh fit without a base checkpoint.
+    """
+    if forget_class == -1:
+        return _new_reducer().fit_transform(activations)
+
+    if mode != 'fit':
+        reducer, base_embedding = await get_base_reducer(forget_class, device)
+        if reducer is not None:
+            activations = project(activations, await get_base_projection(forget_class, device))
+            if mode == 'transform':
+                return reducer.transform(activations)
+            if mode == 'warm_start' and len(activations) == len(base_embedding):
+                warm_reducer = _new_reducer(
+                    init=np.asarray(base_embedding, dtype=np.float32),
+                    n_epochs=UMAP_WARM_START_EPOCHS
+                )
+                return warm_reducer.fit_transform(activations)
+            return _new_reducer().fit_transform(activations)
+
+    projection = await get_base_projection(forget_class, device)
+    return _new_reducer().fit_transform(project(activations, projection))
+
+
+def warm_up(size=256):
+    """
+    Fit and transform a small synthetic embedding so that the numba kernels
+    of UMAP and pynndescent are compiled (and written to NUMBA_CACHE_DIR)
+    before the first job.
+    """
+    start_time = time.time()
+    try:
+        rng = np.random.default_rng(UNLEARN_SEED)
+        activations = rng.random((size, 512), dtype=np.float32)
+        activations = project(activations, fit_projection(activations))
+        reducer = _new_reducer()
+        reducer.fit_transform(activations)
+        reducer.transform(activations[:size // 4])
+    except Exception as e:
+        print(f"UMAP warm-up failed: {e}")
+        return
+    print(f"UMAP warm-up done! Time taken: {time.time() - start_time:.2f}s")
@@ -4,24 +4,48 @@ import time
 
 import matplotlib.pyplot as plt
 import numpy as np
-from umap import UMAP
 
-from app.config import (
-    UMAP_N_NEIGHBORS,
-    UMAP_MIN_DIST,
-    UMAP_INIT,
-    UMAP_N_JOBS
-)
+from app.config import PLOT_UMAP
+from app.utils.plot_service import submit_plot
+from app.utils.umap_embedding import embed_activations
 
 async def compute_umap_embedding(
     activation,
     labels,
     forget_class=-1,
     forget_labels=None,
-    save_dir='umap_visualizations'
+    save_dir='umap_visualizations',
+    device=None
 ):
-    umap_embedding = []
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    print(f"UMAP start!")
+    start_time = time.time()
+    embedding = await embed_activations(activation, forget_class, device)
+    print(f"UMAP done! Time taken: {time.time() - start_time:.2f}s")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f'{timestamp}_umap_layer_last.svg'
+    filepath = os.path.join(save_dir, filename)
+
+    # The SVG is rendered by the plot service; the job only needs the embedding
+    submit_plot(
+        plot_umap_embedding,
+        np.asarray(embedding),
+        np.asarray(labels),
+        forget_class,
+        None if forget_labels is None else np.asarray(forget_labels),
+        filepath,
+        enabled=PLOT_UMAP
+    )
+
+    print("\nUMAP embeddings computation completed!")
+    return embedding
 
+
+def plot_umap_embedding(embedding, labels, forget_class, forget_labels, filepath):
+    """Scatter of a 2-D UMAP embedding colored by predicted class, saved as SVG."""
     class_names = [
         'airplane', 
         'automobile', 
@@ -38,20 +62,7 @@ async def compute_umap_embedding(
         class_names[forget_class] += " (forget)"
 
     colors = plt.cm.tab10(np.linspace(0, 1, 10))
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
-
-    umap = UMAP(n_components=2, 
-                n_neighbors=UMAP_N_NEIGHBORS,
-                min_dist=UMAP_MIN_DIST,
-                init=UMAP_INIT,
-                n_jobs=UMAP_N_JOBS)
-    print(f"UMAP start!")
-    start_time = time.time()
-    embedding = umap.fit_transform(activation)
-    print(f"UMAP done! Time taken: {time.time() - start_time:.2f}s")
 
-    umap_embedding = embedding
     plt.figure(figsize=(12, 11))
     
     # Plot non-forget points
@@ -136,10 +147,6 @@ async def compute_umap_embedding(
     )
     plt.tight_layout()
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f'{timestamp}_umap_layer_last.svg'
-    filepath = os.path.join(save_dir, filename)
-    
     plt.savefig(
         filepath, 
         format='svg', 
@@ -147,6 +154,4 @@ async def compute_umap_embedding(
         bbox_inches='tight', 
         pad_inches=0.1
     )
-        
-    print("\nUMAP embeddings computation and saving completed!")
-    return umap_embedding
\ No newline at end of file
+    plt.close()
@@ -1,8 +1,23 @@
+import os
+import threading
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from app.config import (
+    UMAP_WARMUP,
+    UMAP_NUMBA_CACHE_DIR,
+    GZIP_MINIMUM_SIZE,
+    GZIP_COMPRESS_LEVEL
+)
+
+# numba reads its cache location when it is first imported (through umap)
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.abspath(UMAP_NUMBA_CACHE_DIR))
+
 from app.routers import train, unlearn, data
 from app.utils.helpers import download_weights_from_hub
+from app.utils.umap_embedding import warm_up as warm_up_umap
+from app.utils.plot_service import shutdown_plot_service
 
 # Constants
 ALLOW_ORIGINS = ["*"]  # TODO: Update URL after deployment
@@ -10,7 +25,11 @@ ALLOW_ORIGINS = ["*"]  # TODO: Update URL after deployment
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     download_weights_from_hub()
+    if UMAP_WARMUP:
+        threading.Thread(target=warm_up_umap, daemon=True).start()
     yield
+    # Let queued plots finish writing before the process exits
+    shutdown_plot_service()
 
 def setup_middleware(app: FastAPI) -> None:
     app.add_middleware(
@@ -20,6 +39,11 @@ def setup_middleware(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=GZIP_MINIMUM_SIZE,
+        compresslevel=GZIP_COMPRESS_LEVEL,
+    )
 
 def register_routers(app: FastAPI) -> None:
     app.include_router(train.router)